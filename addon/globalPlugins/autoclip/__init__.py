@@ -6,11 +6,13 @@
 # If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
 # https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
 
+import threading
 import time
 
 import wx
 
 import addonHandler
+import api
 import config
 import core
 import globalPluginHandler
@@ -19,107 +21,42 @@ import gui
 import gui.guiHelper
 import queueHandler
 import scriptHandler
-import speech
 import ui
 from logHandler import log
 
-from . import winclip
+# the clipboard watcher and the modules it uses are imported once automatic reading is first enabled,
+# so loading the add-on at NVDA startup stays cheap while it's disabled, which is the default.
+from .profiles import app_confspec
+from .stats import stats
 
 addonHandler.initTranslation()
 
-min_chunk_size = 100
 DEFAULT_CHUNK_SIZE = 500
 DEFAULT_SPLIT_AT_WORD_BOUNDS = True
+DEFAULT_READ_RICH_TEXT = False
+DEFAULT_SPLIT_AT_SENTENCE_BOUNDS = False
 DEFAULT_MAX_LENGTH = 15000
 DEFAULT_DEBOUNCE_DELAY = 100
 DEFAULT_INTERRUPT_DELAY = 50
-
-
-class ClipboardWatcher:
-    def __init__(self):
-        self.state = False
-        self.window = None
-        self.last_time = 0  # last time a clipboard notification was sent
-        self.last_data = ""  # last text of a clipboard notification
-        self.load_config()
-
-    def load_config(self):
-        conf = config.conf["autoclip"]
-        self.interrupt = conf["interrupt"]
-        self.chunk_size = conf["chunkSize"]
-        self.split_at_word = conf["splitAtWordBounds"]
-        self.max_length = conf["maxLength"]
-        self.debounce_delay = conf["debounceDelay"] / 1000
-        self.interrupt_delay = conf["interruptDelay"] / 1000
-
-    @staticmethod
-    def split_text(text, chunk_size, split_at_word):
-        length = len(text)
-        if not text or length <= chunk_size or not chunk_size or chunk_size < min_chunk_size:
-            return [text]
-
-        chunks = []
-        index = 0
-        while index < length:
-            next_index = min(index + chunk_size, length)
-            chunk = text[index:next_index]
-            if next_index >= length or not split_at_word or chunk.endswith(" "):
-                chunks.append(chunk)
-                index = next_index
-            else:
-                last_space = chunk.rfind(" ")
-                if last_space > 1:
-                    chunks.append(chunk[:last_space])
-                    index += last_space + 1
-                else:
-                    chunks.append(chunk)
-                    index = next_index
-        return chunks
-
-    def message_text(self, text, interrupt=False):
-        if interrupt:
-            speech.cancelSpeech()
-
-        if len(text) > self.chunk_size:
-            chunks = ClipboardWatcher.split_text(text, self.chunk_size, self.split_at_word)
-            for chunk in chunks:
-                ui.message(chunk)
-        else:
-            ui.message(text)
-
-    def start(self):
-        self.window = winclip.ClipboardMessageWindow()
-        self.window.on_clipboard_update = self.notify
-        self.state = True
-
-    def stop(self):
-        self.window.destroy()
-        self.window = None
-        self.state = False
-
-    def notify(self):
-        with winclip.clipboard(self.window.hwnd):
-            data = winclip.get_clipboard_data()
-
-        if data and not data.isspace() and len(data) < self.max_length:
-            current_time = time.monotonic()
-            elapsed = current_time - self.last_time
-
-            if self.last_data == data and (
-                (elapsed < self.debounce_delay) or self.debounce_delay < 0
-            ):
-                self.last_time = current_time
-                return
-
-            should_interrupt = False
-            if self.interrupt and elapsed > self.interrupt_delay:
-                should_interrupt = True
-
-            queueHandler.queueFunction(
-                queueHandler.eventQueue, self.message_text, data, should_interrupt
-            )
-            self.last_data = data
-            self.last_time = current_time
+DEFAULT_SPEECH_LOOKAHEAD = 0
+DEFAULT_BRAILLE_INTERVAL = 100
+DEFAULT_SPEAK_LATEST_ONLY = False
+DEFAULT_DEDUP_HISTORY_SIZE = 1
+DEFAULT_SPEAK_CHANGES_ONLY = False
+DEFAULT_LINE_STREAM = False
+DEFAULT_LINE_STREAM_LINES = 1000
+DEFAULT_ADAPTIVE_TIMING = False
+DEFAULT_ADAPTIVE_MIN_DELAY = 0
+DEFAULT_ADAPTIVE_MAX_DELAY = 300
+DEFAULT_RECORD_TRACE = False
+DEFAULT_RECORD_TRACE_TEXT = False
+DEFAULT_COLLECT_STATISTICS = False
+DEFAULT_RULES_TIME_BUDGET = 50
+DEFAULT_HISTORY_SIZE = 100
+DEFAULT_HISTORY_MAX_CHARACTERS = 100000
+DEFAULT_HISTORY_LOG = False
+DEFAULT_HISTORY_LOG_MAX_FILE_SIZE = 4096
+DEFAULT_HISTORY_LOG_MAX_FILES = 5
 
 
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
@@ -144,9 +81,9 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
         if conf["rememberState"]:
             value = conf["automaticClipboardReading"]
-            if value and not self.watcher:
+            if value and not self.enabled:
                 self.enable()
-            elif not value and self.watcher:
+            elif not value and self.enabled:
                 self.disable()
 
         if conf["showInToolsMenu"] and not self.menuItem:
@@ -175,27 +112,144 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             config.conf["autoclip"]["interrupt"] = False
             ui.message(_('Disabled "Interrupt before speaking the clipboard"'))
 
+    @scriptHandler.script(
+        description=_(
+            "Reports statistics of Autoclip clipboard reading, press twice to copy them to the clipboard"
+        ),
+        category=_("Autoclip"),
+    )
+    def script_reportStatistics(self, gesture):
+        summary = stats.summary()
+        if not summary:
+            ui.message(
+                _(
+                    "No Autoclip statistics have been collected. Enable collecting statistics in the Autoclip settings."
+                )
+            )
+            return
+        if scriptHandler.getLastScriptRepeatCount() == 1:
+            if api.copyToClip(summary):
+                ui.message(_("Copied Autoclip statistics to the clipboard"))
+        else:
+            ui.message(summary)
+            stats.dump()
+
+    def reviewHistory(self, step):
+        # the history is kept while automatic reading is disabled
+        if not self.watcher or not len(self.watcher.history):
+            ui.message(_("No clipboard history"))
+            return
+        text = self.watcher.history.move(step)
+        if text is None:
+            ui.message(_("Oldest clipboard text") if step > 0 else _("Newest clipboard text"))
+            return
+        self.watcher.message_text(text, interrupt=True)
+
+    @scriptHandler.script(
+        description=_("Speaks the previous text in the Autoclip clipboard history"),
+        category=_("Autoclip"),
+    )
+    def script_historyPrevious(self, gesture):
+        self.reviewHistory(1)
+
+    @scriptHandler.script(
+        description=_("Speaks the next text in the Autoclip clipboard history"),
+        category=_("Autoclip"),
+    )
+    def script_historyNext(self, gesture):
+        self.reviewHistory(-1)
+
+    @scriptHandler.script(
+        description=_("Copies the current text of the Autoclip clipboard history to the clipboard"),
+        category=_("Autoclip"),
+    )
+    def script_historyCopy(self, gesture):
+        text = self.watcher.history.current() if self.watcher else None
+        if not text:
+            ui.message(_("No clipboard history"))
+            return
+        if api.copyToClip(text):
+            # it was already spoken, don't read it again
+            self.watcher.skip_current_clipboard()
+            ui.message(_("Copied"))
+
+    @scriptHandler.script(
+        description=_("Searches the Autoclip history log for a text"),
+        category=_("Autoclip"),
+    )
+    def script_searchHistoryLog(self, gesture):
+        if not config.conf["autoclip"]["historyLog"]:
+            ui.message(_("The Autoclip history log is disabled"))
+            return
+        wx.CallAfter(self.showHistoryLogSearch)
+
+    def showHistoryLogSearch(self):
+        gui.mainFrame.prePopup()
+        dialog = wx.TextEntryDialog(
+            gui.mainFrame, _("Text to search for:"), _("Search the Autoclip history log")
+        )
+        result = dialog.ShowModal()
+        query = dialog.GetValue()
+        dialog.Destroy()
+        gui.mainFrame.postPopup()
+        if result == wx.ID_OK and query:
+            # reading the log can take a while, so it's searched in the background
+            threading.Thread(
+                target=self.searchHistoryLog,
+                args=(query,),
+                name="Autoclip history search",
+                daemon=True,
+            ).start()
+
+    def searchHistoryLog(self, query):
+        # only loaded when searching
+        from .historylog import default_log_directory, search  # noqa: PLC0415
+
+        try:
+            results = search(default_log_directory(), query)
+        except Exception:
+            log.error("Could not search the Autoclip history log", exc_info=True)
+            results = []
+        if not results:
+            wx.CallAfter(ui.message, _("Not found"))
+            return
+        message = "\n\n".join(
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}\n{text}"
+            for timestamp, text in results
+        )
+        wx.CallAfter(ui.browseableMessage, message, _("Autoclip history log"))
+
+    @property
+    def enabled(self):
+        return self.watcher is not None and not self.watcher.paused
+
     def enable(self):
-        if self.watcher:
+        # The watcher and its clipboard listener window are created on the first enable,
+        # after that disabling only pauses it, they are destroyed in terminate.
+        if self.enabled:
             return
-        self.watcher = ClipboardWatcher()
-        self.watcher.start()
+        if self.watcher:
+            self.watcher.resume()
+        else:
+            # only loaded once automatic reading is first enabled
+            from .watcher import ClipboardWatcher  # noqa: PLC0415
+
+            self.watcher = ClipboardWatcher()
+            self.watcher.start()
         log.debug("Enabled")
         if self.menuItem:
             self.menuItem.Check()
 
     def disable(self):
-        if not self.watcher:
+        if not self.enabled:
             return
-        if self.watcher.state:
-            self.watcher.stop()
-        self.watcher = None
+        self.watcher.pause()
         log.debug("Disabled")
         if self.menuItem:
             self.menuItem.Check(False)
 
     def toggle(self):
-        if not self.watcher:
+        if not self.enabled:
             self.enable()
             config.conf["autoclip"]["automaticClipboardReading"] = True
             ui.message(_("Enabled Automatic Clipboard Reading."))
@@ -214,7 +268,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             _("Toggles Autoclip, Automatic clipboard reading."),
         )
         gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, lambda event: self.toggle(), self.menuItem)
-        if self.watcher and self.watcher.state:
+        if self.enabled:
             self.menuItem.Check()
 
     def deleteMenuItem(self):
@@ -226,7 +280,9 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
     def terminate(self):
         super().terminate()
-        self.disable()
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
         gui.settingsDialogs.NVDASettingsDialog.categoryClasses.remove(AutoclipSettings)
         self.deleteMenuItem()
         core.postNvdaStartup.unregister(self.onConfigInit)
@@ -240,9 +296,34 @@ confspec = {
     "showInToolsMenu": "boolean(default=true)",
     "chunkSize": f"integer(default={DEFAULT_CHUNK_SIZE})",
     "maxLength": f"integer(default={DEFAULT_MAX_LENGTH})",
+    "readRichText": f"boolean(default={str(DEFAULT_READ_RICH_TEXT).lower()})",
     "splitAtWordBounds": f"boolean(default={str(DEFAULT_SPLIT_AT_WORD_BOUNDS).lower()})",
+    "splitAtSentenceBounds": f"boolean(default={str(DEFAULT_SPLIT_AT_SENTENCE_BOUNDS).lower()})",
     "debounceDelay": f"integer(default={DEFAULT_DEBOUNCE_DELAY})",
     "interruptDelay": f"integer(default={DEFAULT_INTERRUPT_DELAY})",
+    "speechLookahead": f"integer(default={DEFAULT_SPEECH_LOOKAHEAD})",
+    "brailleInterval": f"integer(default={DEFAULT_BRAILLE_INTERVAL})",
+    "dedupHistorySize": f"integer(default={DEFAULT_DEDUP_HISTORY_SIZE})",
+    "speakChangesOnly": f"boolean(default={str(DEFAULT_SPEAK_CHANGES_ONLY).lower()})",
+    "lineStream": f"boolean(default={str(DEFAULT_LINE_STREAM).lower()})",
+    "lineStreamLines": f"integer(default={DEFAULT_LINE_STREAM_LINES})",
+    "speakLatestOnly": f"boolean(default={str(DEFAULT_SPEAK_LATEST_ONLY).lower()})",
+    "adaptiveTiming": f"boolean(default={str(DEFAULT_ADAPTIVE_TIMING).lower()})",
+    "adaptiveMinDelay": f"integer(default={DEFAULT_ADAPTIVE_MIN_DELAY})",
+    "adaptiveMaxDelay": f"integer(default={DEFAULT_ADAPTIVE_MAX_DELAY})",
+    "recordTrace": f"boolean(default={str(DEFAULT_RECORD_TRACE).lower()})",
+    "recordTraceText": f"boolean(default={str(DEFAULT_RECORD_TRACE_TEXT).lower()})",
+    "collectStatistics": f"boolean(default={str(DEFAULT_COLLECT_STATISTICS).lower()})",
+    "ignorePatterns": "string_list(default=list())",
+    "replacements": "string_list(default=list())",
+    "rulesTimeBudget": f"integer(default={DEFAULT_RULES_TIME_BUDGET})",
+    "historySize": f"integer(default={DEFAULT_HISTORY_SIZE})",
+    "historyMaxCharacters": f"integer(default={DEFAULT_HISTORY_MAX_CHARACTERS})",
+    "historyLog": f"boolean(default={str(DEFAULT_HISTORY_LOG).lower()})",
+    "historyLogMaxFileSize": f"integer(default={DEFAULT_HISTORY_LOG_MAX_FILE_SIZE})",
+    "historyLogMaxFiles": f"integer(default={DEFAULT_HISTORY_LOG_MAX_FILES})",
+    # per application overrides, see profiles.py
+    "apps": {"__many__": app_confspec},
 }
 
 config.conf.spec["autoclip"] = confspec
@@ -252,6 +333,9 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
     title = _("Autoclip")
 
     def makeSettings(self, panelSizer):
+        # only loaded when the settings are opened
+        from .rules import REPLACEMENT_SEPARATOR  # noqa: PLC0415
+
         sHelper = gui.guiHelper.BoxSizerHelper(self, sizer=panelSizer)
 
         self.interruptCB = sHelper.addItem(
@@ -289,6 +373,15 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
             )
         )
 
+        self.splitAtSentenceCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "When splitting text, prefer to split segments at sentence and punctuation boundaries"
+                ),
+            )
+        )
+
         self.maxLengthEdit = gHelper.addLabeledControl(
             _("Maximum text length to speak (characters):"),
             wx.SpinCtrl,
@@ -296,6 +389,15 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
             max=1000000,
         )
 
+        self.readRichTextCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Read HTML and rich text (RTF) from the clipboard when it has no plain text"
+                ),
+            )
+        )
+
         self.debounceDelayEdit = gHelper.addLabeledControl(
             _(
                 "Debounce Delay to not speaking a clipboard update with the same text (milliseconds) (0 to disable and never filter extra equivalent clipboard updates) (-1 to never speak an equivalent clipboard update:"
@@ -305,6 +407,15 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
             max=30000,
         )
 
+        self.dedupHistorySizeEdit = gHelper.addLabeledControl(
+            _(
+                "Number of recent clipboard texts the debounce delay applies to (1 to only compare with the previous text):"
+            ),
+            wx.SpinCtrl,
+            min=1,
+            max=1000,
+        )
+
         self.interruptDelayEdit = gHelper.addLabeledControl(
             _(
                 "Minimum delay between speech interrupts (milliseconds) (0 to disable and to always interrupt):"
@@ -314,6 +425,161 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
             max=5000,
         )
 
+        self.speechLookaheadEdit = gHelper.addLabeledControl(
+            _(
+                "Number of segments to queue for speech at a time, the next segment is queued when one finishes (0 to queue all segments at once):"
+            ),
+            wx.SpinCtrl,
+            min=0,
+            max=50,
+        )
+
+        self.brailleIntervalEdit = gHelper.addLabeledControl(
+            _(
+                "Minimum delay between braille messages of clipboard text (milliseconds) (0 to show every clipboard update):"
+            ),
+            wx.SpinCtrl,
+            min=0,
+            max=5000,
+        )
+
+        self.changesOnlyCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Only speak what changed compared to the previous clipboard text (added or changed lines)"
+                ),
+            )
+        )
+
+        self.lineStreamCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Only speak new lines, for clipboard text that is appended to like a log (also reads the end of text longer than the maximum length)"
+                ),
+            )
+        )
+
+        self.lineStreamLinesEdit = gHelper.addLabeledControl(
+            _(
+                "Number of recent lines to remember when only speaking new lines (only this many lines at the end of the clipboard text are examined):"
+            ),
+            wx.SpinCtrl,
+            min=1,
+            max=100000,
+        )
+
+        self.latestOnlyCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Only speak the latest clipboard update, skipping older updates still waiting to be spoken"
+                ),
+            )
+        )
+
+        self.adaptiveCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Adapt delays to how fast the clipboard is updated, coalescing bursts of updates"
+                ),
+            )
+        )
+
+        self.adaptiveMinDelayEdit = gHelper.addLabeledControl(
+            _("Minimum adaptive delay (milliseconds):"),
+            wx.SpinCtrl,
+            min=0,
+            max=5000,
+        )
+
+        self.adaptiveMaxDelayEdit = gHelper.addLabeledControl(
+            _("Maximum adaptive delay (milliseconds):"),
+            wx.SpinCtrl,
+            min=0,
+            max=5000,
+        )
+
+        self.recordTraceCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Record a trace of clipboard updates (timing, length and a hash of the text) for tuning these settings"
+                ),
+            )
+        )
+
+        self.recordTraceTextCB = gHelper.addItem(
+            wx.CheckBox(gbox, label=_("Include the clipboard text in recorded traces"))
+        )
+
+        self.ignorePatternsEdit = gHelper.addLabeledControl(
+            _("Don't speak lines matching these regular expressions (one per line):"),
+            wx.TextCtrl,
+            style=wx.TE_MULTILINE,
+        )
+
+        self.replacementsEdit = gHelper.addLabeledControl(
+            _(
+                "Replace text matching regular expressions before speaking it (one per line, written as: expression{separator}replacement):"
+            ).format(separator=REPLACEMENT_SEPARATOR),
+            wx.TextCtrl,
+            style=wx.TE_MULTILINE,
+        )
+
+        self.rulesTimeBudgetEdit = gHelper.addLabeledControl(
+            _("Maximum time to spend applying these rules to a clipboard update (milliseconds):"),
+            wx.SpinCtrl,
+            min=1,
+            max=1000,
+        )
+
+        self.historySizeEdit = gHelper.addLabeledControl(
+            _("Number of spoken clipboard texts to keep in the history (0 to disable):"),
+            wx.SpinCtrl,
+            min=0,
+            max=10000,
+        )
+
+        self.historyMaxCharactersEdit = gHelper.addLabeledControl(
+            _("Maximum total length of the texts kept in the history (characters):"),
+            wx.SpinCtrl,
+            min=0,
+            max=10000000,
+        )
+
+        self.historyLogCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_(
+                    "Write spoken clipboard texts to a compressed history log in the NVDA configuration directory"
+                ),
+            )
+        )
+
+        self.historyLogMaxFileSizeEdit = gHelper.addLabeledControl(
+            _("Maximum size of each history log file (kilobytes):"),
+            wx.SpinCtrl,
+            min=64,
+            max=1048576,
+        )
+
+        self.historyLogMaxFilesEdit = gHelper.addLabeledControl(
+            _("Number of history log files to keep:"),
+            wx.SpinCtrl,
+            min=1,
+            max=1000,
+        )
+
+        self.collectStatisticsCB = gHelper.addItem(
+            wx.CheckBox(
+                gbox,
+                label=_("Collect statistics about clipboard reading (counters and timings)"),
+            )
+        )
+
         self.restoreDefaultsButton = gHelper.addItem(
             wx.Button(gbox, label=_("Restore advanced settings to &defaults"))
         )
@@ -329,16 +595,84 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
         self.showCB.SetValue(conf["showInToolsMenu"])
         self.chunkSizeEdit.SetValue(conf["chunkSize"])
         self.splitAtWordCB.SetValue(conf["splitAtWordBounds"])
+        self.splitAtSentenceCB.SetValue(conf["splitAtSentenceBounds"])
         self.maxLengthEdit.SetValue(conf["maxLength"])
+        self.readRichTextCB.SetValue(conf["readRichText"])
         self.debounceDelayEdit.SetValue(conf["debounceDelay"])
+        self.dedupHistorySizeEdit.SetValue(conf["dedupHistorySize"])
         self.interruptDelayEdit.SetValue(conf["interruptDelay"])
+        self.speechLookaheadEdit.SetValue(conf["speechLookahead"])
+        self.brailleIntervalEdit.SetValue(conf["brailleInterval"])
+        self.changesOnlyCB.SetValue(conf["speakChangesOnly"])
+        self.lineStreamCB.SetValue(conf["lineStream"])
+        self.lineStreamLinesEdit.SetValue(conf["lineStreamLines"])
+        self.latestOnlyCB.SetValue(conf["speakLatestOnly"])
+        self.adaptiveCB.SetValue(conf["adaptiveTiming"])
+        self.adaptiveMinDelayEdit.SetValue(conf["adaptiveMinDelay"])
+        self.adaptiveMaxDelayEdit.SetValue(conf["adaptiveMaxDelay"])
+        self.recordTraceCB.SetValue(conf["recordTrace"])
+        self.recordTraceTextCB.SetValue(conf["recordTraceText"])
+        self.collectStatisticsCB.SetValue(conf["collectStatistics"])
+        self.ignorePatternsEdit.SetValue("\n".join(conf["ignorePatterns"]))
+        self.replacementsEdit.SetValue("\n".join(conf["replacements"]))
+        self.rulesTimeBudgetEdit.SetValue(conf["rulesTimeBudget"])
+        self.historySizeEdit.SetValue(conf["historySize"])
+        self.historyMaxCharactersEdit.SetValue(conf["historyMaxCharacters"])
+        self.historyLogCB.SetValue(conf["historyLog"])
+        self.historyLogMaxFileSizeEdit.SetValue(conf["historyLogMaxFileSize"])
+        self.historyLogMaxFilesEdit.SetValue(conf["historyLogMaxFiles"])
 
     def onRestoreDefaults(self, evt):
         self.chunkSizeEdit.SetValue(DEFAULT_CHUNK_SIZE)
         self.splitAtWordCB.SetValue(DEFAULT_SPLIT_AT_WORD_BOUNDS)
+        self.splitAtSentenceCB.SetValue(DEFAULT_SPLIT_AT_SENTENCE_BOUNDS)
         self.maxLengthEdit.SetValue(DEFAULT_MAX_LENGTH)
+        self.readRichTextCB.SetValue(DEFAULT_READ_RICH_TEXT)
         self.debounceDelayEdit.SetValue(DEFAULT_DEBOUNCE_DELAY)
+        self.dedupHistorySizeEdit.SetValue(DEFAULT_DEDUP_HISTORY_SIZE)
         self.interruptDelayEdit.SetValue(DEFAULT_INTERRUPT_DELAY)
+        self.speechLookaheadEdit.SetValue(DEFAULT_SPEECH_LOOKAHEAD)
+        self.brailleIntervalEdit.SetValue(DEFAULT_BRAILLE_INTERVAL)
+        self.changesOnlyCB.SetValue(DEFAULT_SPEAK_CHANGES_ONLY)
+        self.lineStreamCB.SetValue(DEFAULT_LINE_STREAM)
+        self.lineStreamLinesEdit.SetValue(DEFAULT_LINE_STREAM_LINES)
+        self.latestOnlyCB.SetValue(DEFAULT_SPEAK_LATEST_ONLY)
+        self.adaptiveCB.SetValue(DEFAULT_ADAPTIVE_TIMING)
+        self.adaptiveMinDelayEdit.SetValue(DEFAULT_ADAPTIVE_MIN_DELAY)
+        self.adaptiveMaxDelayEdit.SetValue(DEFAULT_ADAPTIVE_MAX_DELAY)
+        self.recordTraceCB.SetValue(DEFAULT_RECORD_TRACE)
+        self.recordTraceTextCB.SetValue(DEFAULT_RECORD_TRACE_TEXT)
+        self.collectStatisticsCB.SetValue(DEFAULT_COLLECT_STATISTICS)
+        self.rulesTimeBudgetEdit.SetValue(DEFAULT_RULES_TIME_BUDGET)
+        self.historySizeEdit.SetValue(DEFAULT_HISTORY_SIZE)
+        self.historyMaxCharactersEdit.SetValue(DEFAULT_HISTORY_MAX_CHARACTERS)
+        self.historyLogCB.SetValue(DEFAULT_HISTORY_LOG)
+        self.historyLogMaxFileSizeEdit.SetValue(DEFAULT_HISTORY_LOG_MAX_FILE_SIZE)
+        self.historyLogMaxFilesEdit.SetValue(DEFAULT_HISTORY_LOG_MAX_FILES)
+
+    @staticmethod
+    def getLines(edit):
+        return [line for line in edit.GetValue().splitlines() if line]
+
+    def isValid(self):
+        # only loaded when the settings are saved
+        from .rules import find_invalid_rule  # noqa: PLC0415
+
+        invalid = find_invalid_rule(
+            self.getLines(self.ignorePatternsEdit), self.getLines(self.replacementsEdit)
+        )
+        if invalid:
+            rule, error = invalid
+            gui.messageBox(
+                _("The rule {rule} is not a valid regular expression: {error}").format(
+                    rule=rule, error=error
+                ),
+                _("Autoclip"),
+                wx.OK | wx.ICON_ERROR,
+                self,
+            )
+            return False
+        return super().isValid()
 
     def onSave(self):
         conf = config.conf["autoclip"]
@@ -347,9 +681,32 @@ class AutoclipSettings(gui.settingsDialogs.SettingsPanel):
         conf["showInToolsMenu"] = self.showCB.IsChecked()
         conf["chunkSize"] = self.chunkSizeEdit.GetValue()
         conf["splitAtWordBounds"] = self.splitAtWordCB.IsChecked()
+        conf["splitAtSentenceBounds"] = self.splitAtSentenceCB.IsChecked()
         conf["maxLength"] = self.maxLengthEdit.GetValue()
+        conf["readRichText"] = self.readRichTextCB.IsChecked()
         conf["debounceDelay"] = self.debounceDelayEdit.GetValue()
+        conf["dedupHistorySize"] = self.dedupHistorySizeEdit.GetValue()
         conf["interruptDelay"] = self.interruptDelayEdit.GetValue()
+        conf["speechLookahead"] = self.speechLookaheadEdit.GetValue()
+        conf["brailleInterval"] = self.brailleIntervalEdit.GetValue()
+        conf["speakChangesOnly"] = self.changesOnlyCB.IsChecked()
+        conf["lineStream"] = self.lineStreamCB.IsChecked()
+        conf["lineStreamLines"] = self.lineStreamLinesEdit.GetValue()
+        conf["speakLatestOnly"] = self.latestOnlyCB.IsChecked()
+        conf["adaptiveTiming"] = self.adaptiveCB.IsChecked()
+        conf["adaptiveMinDelay"] = self.adaptiveMinDelayEdit.GetValue()
+        conf["adaptiveMaxDelay"] = self.adaptiveMaxDelayEdit.GetValue()
+        conf["recordTrace"] = self.recordTraceCB.IsChecked()
+        conf["recordTraceText"] = self.recordTraceTextCB.IsChecked()
+        conf["collectStatistics"] = self.collectStatisticsCB.IsChecked()
+        conf["ignorePatterns"] = self.getLines(self.ignorePatternsEdit)
+        conf["replacements"] = self.getLines(self.replacementsEdit)
+        conf["rulesTimeBudget"] = self.rulesTimeBudgetEdit.GetValue()
+        conf["historySize"] = self.historySizeEdit.GetValue()
+        conf["historyMaxCharacters"] = self.historyMaxCharactersEdit.GetValue()
+        conf["historyLog"] = self.historyLogCB.IsChecked()
+        conf["historyLogMaxFileSize"] = self.historyLogMaxFileSizeEdit.GetValue()
+        conf["historyLogMaxFiles"] = self.historyLogMaxFilesEdit.GetValue()
         plugin = next(
             (p for p in globalPluginHandler.runningPlugins if type(p) is GlobalPlugin), None
         )
@@ -0,0 +1,54 @@
+# adaptive
+# estimates how fast the clipboard is being updated, to adapt delays to the current application.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# the delay covers this many times the average interval, so the next update of a burst is usually caught.
+COALESCE_FACTOR = 1.5
+
+
+class UpdateRateEstimator:
+    # Exponentially weighted moving average of the interval between updates, in O(1) memory.
+    # Times are passed in by the caller, so a simulated clock can drive it.
+    # Intervals above max_interval are counted as max_interval, so a long idle period
+    # does not take many updates to be forgotten once a burst starts.
+    def __init__(self, alpha=0.3, max_interval=1.0):
+        self.alpha = alpha
+        self.max_interval = max_interval
+        self.interval = None
+        self.last_sample = None
+        self.last_update = None
+
+    def update(self, now):
+        if self.last_update is not None:
+            sample = min(now - self.last_update, self.max_interval)
+            self.last_sample = sample
+            if self.interval is None:
+                self.interval = sample
+            else:
+                self.interval += self.alpha * (sample - self.interval)
+        self.last_update = now
+
+    def reset(self):
+        self.interval = None
+        self.last_sample = None
+        self.last_update = None
+
+    def delay(self, now, min_delay, max_delay):
+        # Updates further apart than max_delay can't be coalesced anyway, so be as responsive as possible,
+        # the same goes for the first update after a pause.
+        # Otherwise wait long enough to catch the next update of the burst.
+        interval = self.interval
+        if (
+            interval is None
+            or interval >= max_delay
+            or self.last_sample >= max_delay
+            or self.last_update is None
+            or now - self.last_update >= max_delay
+        ):
+            return min_delay
+        return max(min_delay, min(max_delay, interval * COALESCE_FACTOR))
@@ -0,0 +1,241 @@
+# backends
+# clipboard backends used by the clipboard watcher: the Win32 clipboard, and in memory ones for other platforms.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import abc
+import contextlib
+import threading
+from typing import NamedTuple, Optional
+
+from .stats import stats
+
+MAX_CACHED_OWNERS = 64
+# errors of a snapshot, opening may be retried while the clipboard is held open by another program
+SNAPSHOT_OPEN_FAILED = "open"
+SNAPSHOT_READ_FAILED = "read"
+
+
+class ClipboardSnapshot(NamedTuple):
+    text: str  # empty if there is no text, it's longer than the maximum length, or on error
+    sequence: int  # sequence number of the clipboard when it was read, 0 if unknown
+    error: Optional[str]
+
+
+class ClipboardBackend(abc.ABC):
+    # on_update is called without arguments whenever the clipboard changes, possibly from another thread.
+    # start, stop and read_text must be implemented, the other methods have defaults for backends
+    # that can't tell.
+    read_rich_text = False
+
+    @abc.abstractmethod
+    def start(self, on_update): ...
+
+    @abc.abstractmethod
+    def stop(self): ...
+
+    def sequence_number(self):
+        # 0 if unknown, in which case the clipboard is always read
+        return 0
+
+    def is_text_available(self):
+        return True
+
+    def owner_app(self):
+        # name of the application that last changed the clipboard, empty if unknown
+        return ""
+
+    @contextlib.contextmanager
+    def opened(self):
+        # yields whether the clipboard could be opened, it might be held open by another program.
+        yield True
+
+    @abc.abstractmethod
+    def read_text(self, max_length=None, tail=False):
+        # Must be called while the clipboard is opened,
+        # returns an empty string if there is no text or it's longer than max_length.
+        # With tail, text longer than max_length is not rejected, its last max_length + 1 characters are returned.
+        ...
+
+    def read_snapshot(self, max_length=None, tail=False):
+        # opens the clipboard, reads its text and closes it
+        with self.opened() as opened:
+            if not opened:
+                return ClipboardSnapshot("", 0, SNAPSHOT_OPEN_FAILED)
+            return ClipboardSnapshot(self.read_text(max_length, tail), self.sequence_number(), None)
+
+
+class Win32Backend(ClipboardBackend):
+    # When read_rich_text is set, HTML or RTF is converted to text if the clipboard has no plain text.
+    def __init__(self):
+        # imported here so the other backends can be used where ctypes.windll does not exist
+        from . import richtext, winclip  # noqa: PLC0415
+
+        self.winclip = winclip
+        self.window = None
+        self.read_rich_text = False
+        self.rich_text_formats = (
+            (winclip.HTML_FORMAT_NAME, richtext.cf_html_to_text),
+            (winclip.RTF_FORMAT_NAME, richtext.rtf_to_text),
+        )
+        self.max_markup_ratio = richtext.MAX_MARKUP_RATIO
+        self._owners = {}  # clipboard owner window handle: (process id, application name)
+
+    def start(self, on_update):
+        self.window = self.winclip.ClipboardMessageWindow()
+        self.window.on_clipboard_update = on_update
+
+    def stop(self):
+        self.window.destroy()
+        self.window = None
+        self._owners.clear()
+
+    def sequence_number(self):
+        return self.winclip.GetClipboardSequenceNumber()
+
+    def owner_app(self):
+        # Looking up the process name opens the process, so it's cached by window handle.
+        # The process id is cheap to get and detects a handle reused by another process.
+        winclip = self.winclip
+        hwnd = winclip.GetClipboardOwner()
+        if not hwnd:
+            return ""
+        process_id = winclip.get_window_process_id(hwnd)
+        cached = self._owners.get(hwnd)
+        if cached is not None and cached[0] == process_id:
+            return cached[1]
+        if len(self._owners) >= MAX_CACHED_OWNERS:
+            self._owners.clear()
+        name = winclip.get_process_name(process_id) if process_id else ""
+        self._owners[hwnd] = (process_id, name)
+        return name
+
+    def _available_rich_text_format(self):
+        for name, convert in self.rich_text_formats:
+            data_format = self.winclip.registered_format(name)
+            if data_format and self.winclip.is_format_available(data_format):
+                return data_format, convert
+        return None, None
+
+    def is_text_available(self):
+        if self.winclip.is_format_available():
+            return True
+        return self.read_rich_text and self._available_rich_text_format()[0] is not None
+
+    @contextlib.contextmanager
+    def opened(self):
+        with self.winclip.clipboard(self.window.hwnd) as opened:
+            yield opened
+
+    def read_snapshot(self, max_length=None, tail=False):
+        # plain text is read with a single call doing all of the Win32 calls,
+        # the rich text fallback takes the slower path through read_text.
+        winclip = self.winclip
+        if self.read_rich_text and not winclip.is_format_available():
+            return super().read_snapshot(max_length, tail)
+        return winclip.read_text_snapshot(self.window.hwnd, max_length, tail)
+
+    def read_text(self, max_length=None, tail=False):
+        # only the tail of plain text can be read, rich text longer than max_length is still rejected
+        winclip = self.winclip
+        if winclip.is_format_available() or not self.read_rich_text:
+            return winclip.get_clipboard_data(max_length=max_length, tail=tail)
+        data_format, convert = self._available_rich_text_format()
+        if data_format is None:
+            return ""
+        max_size = None if max_length is None else max_length * self.max_markup_ratio
+        data = winclip.get_clipboard_bytes(data_format, max_size)
+        if not data:
+            return ""
+        start = stats.begin()
+        try:
+            return convert(data, max_length)
+        finally:
+            stats.end("convertRichText", start)
+
+
+class MemoryBackend(ClipboardBackend):
+    # an in memory clipboard, set_text simulates another application writing to the clipboard.
+    def __init__(self):
+        self.text = None
+        self.owner = ""
+        self.sequence = 0
+        self.on_update = None
+        self.opens = 0
+        self.failing_opens = 0  # number of following opens that fail, to simulate contention
+        self._lock = threading.Lock()
+
+    def start(self, on_update):
+        self.on_update = on_update
+
+    def stop(self):
+        self.on_update = None
+
+    def set_text(self, text, owner=""):
+        # None simulates clipboard content without text, such as an image
+        with self._lock:
+            self.text = text
+            self.owner = owner
+            self.sequence += 1
+        if self.on_update:
+            self.on_update()
+
+    def sequence_number(self):
+        return self.sequence
+
+    def is_text_available(self):
+        return self.text is not None
+
+    def owner_app(self):
+        return self.owner
+
+    @contextlib.contextmanager
+    def opened(self):
+        with self._lock:
+            self.opens += 1
+            if self.failing_opens > 0:
+                self.failing_opens -= 1
+                yield False
+            else:
+                yield True
+
+    def read_text(self, max_length=None, tail=False):
+        text = self.text or ""
+        if max_length is not None and len(text) > max_length:
+            return text[-max_length - 1 :] if tail else ""
+        return text
+
+
+class SimulatedClock:
+    # can be passed as the clock of a ClipboardWatcher, so time only moves when told to.
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ReplayBackend(MemoryBackend):
+    # Replays a sequence of (timestamp, text) updates. With a SimulatedClock the updates are fed as fast as possible
+    # while the clock shows the recorded times, otherwise the original timing is reproduced with sleep.
+    def __init__(self, updates, clock=None):
+        super().__init__()
+        self.updates = updates
+        self.clock = clock
+
+    def replay(self, sleep=None):
+        previous = None
+        for timestamp, text in self.updates:
+            if self.clock is not None:
+                self.clock.now = timestamp
+            elif sleep is not None and previous is not None:
+                sleep(max(0, timestamp - previous))
+            previous = timestamp
+            self.set_text(text)
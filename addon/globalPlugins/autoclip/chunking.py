@@ -0,0 +1,118 @@
+# chunking
+# boundary strategies used to split long clipboard text into segments spoken separately.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import re
+
+min_chunk_size = 100
+
+# boundary ranks, a higher rank is preferred when choosing where to end a chunk.
+RANK_SPACE = 0
+RANK_CLAUSE = 1
+RANK_SENTENCE = 2
+
+# Latin punctuation only counts when followed by whitespace, so "3.14" or "a,b" are not boundaries.
+# CJK punctuation is not followed by spaces, so it always counts.
+# The curly quotes and fullwidth punctuation are meant, not look-alikes of ASCII characters.
+_BOUNDARY_RE = re.compile(
+    r"(?P<sentence>[.!?…]+[\"'”’)\]]*(?=\s)|[。！？｡]+[」』”’）]*)\s*"  # noqa: RUF001
+    r"|(?P<clause>[,;:]+(?=\s)|[，、；：]+)\s*"  # noqa: RUF001
+    r"|\s+"
+)
+
+
+def _should_split(text, chunk_size):
+    return bool(text) and len(text) > chunk_size and chunk_size >= min_chunk_size
+
+
+def iter_hard_bounds(text, chunk_size):
+    length = len(text)
+    if not _should_split(text, chunk_size):
+        yield 0, length
+        return
+    for index in range(0, length, chunk_size):
+        yield index, min(index + chunk_size, length)
+
+
+def iter_word_bounds(text, chunk_size):
+    # yields (start, end) offsets of each chunk, so no slice is made until a chunk is spoken.
+    length = len(text)
+    if not _should_split(text, chunk_size):
+        yield 0, length
+        return
+
+    index = 0
+    while index < length:
+        next_index = min(index + chunk_size, length)
+        if next_index >= length or text[next_index - 1] == " ":
+            yield index, next_index
+            index = next_index
+        else:
+            last_space = text.rfind(" ", index, next_index)
+            if last_space - index > 1:
+                yield index, last_space
+                index = last_space + 1
+            else:
+                yield index, next_index
+                index = next_index
+
+
+def _cut(latest, start, chunk_size, min_length):
+    for rank in (RANK_SENTENCE, RANK_CLAUSE):
+        boundary = latest[rank]
+        if boundary and boundary[0] - start >= min_length:
+            return boundary
+    boundary = latest[RANK_SPACE]
+    if boundary and boundary[0] - start > 1:
+        return boundary
+    return start + chunk_size, start + chunk_size
+
+
+def iter_sentence_bounds(text, chunk_size):
+    # Prefers sentence ends, then clause punctuation, then any whitespace, then a hard cut.
+    # Boundaries come from a single regex scan, only the furthest boundary of each rank seen so far is kept,
+    # which is all that is needed to pick the best end for the current chunk, so this stays linear.
+    length = len(text)
+    if not _should_split(text, chunk_size):
+        yield 0, length
+        return
+
+    # punctuation is only preferred over whitespace when it does not leave a chunk shorter than this.
+    min_length = chunk_size // 2
+    latest = [None, None, None]  # (end of chunk, start of next chunk) per rank
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        if match.group("sentence"):
+            rank, end = RANK_SENTENCE, match.end("sentence")
+        elif match.group("clause"):
+            rank, end = RANK_CLAUSE, match.end("clause")
+        else:
+            rank, end = RANK_SPACE, match.start()
+        while end - start > chunk_size:
+            chunk_end, next_start = _cut(latest, start, chunk_size, min_length)
+            yield start, chunk_end
+            start = next_start
+        latest[rank] = (end, match.end())
+    while length - start > chunk_size:
+        chunk_end, next_start = _cut(latest, start, chunk_size, min_length)
+        yield start, chunk_end
+        start = next_start
+    if start < length:
+        yield start, length
+
+
+def get_splitter(split_at_word, split_at_sentence):
+    if split_at_sentence:
+        return iter_sentence_bounds
+    if split_at_word:
+        return iter_word_bounds
+    return iter_hard_bounds
+
+
+def split_text(text, chunk_size, splitter=iter_word_bounds):
+    return [text[start:end] for start, end in splitter(text, chunk_size)]
@@ -0,0 +1,43 @@
+# dedup
+# remembers recently spoken clipboard texts by hash, to filter repeated clipboard updates.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import collections
+
+
+def text_key(text):
+    # the length makes a collision of two different texts even less likely
+    return hash(text), len(text)
+
+
+class RecentHashes:
+    # An LRU of text keys with the time each was last seen. Only keys are stored, never the texts,
+    # so memory stays constant no matter how large the clipboard is.
+    # A ttl of 0 disables filtering, a negative ttl never lets an entry expire.
+    def __init__(self, size=1, ttl=0.0):
+        self.size = size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+
+    def seen(self, key, now):
+        # returns True if key was seen within the ttl, and records it as seen now either way.
+        entries = self._entries
+        last_seen = entries.get(key)
+        entries[key] = now
+        entries.move_to_end(key)
+        if last_seen is None:
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+            return False
+        return self.ttl < 0 or now - last_seen < self.ttl
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
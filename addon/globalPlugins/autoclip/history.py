@@ -0,0 +1,84 @@
+# history
+# recently spoken clipboard texts, to review them again.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import collections
+import itertools
+import threading
+
+from .dedup import text_key
+
+
+class ClipboardHistory:
+    # Texts are kept by their dedup key, so a text spoken again is moved to the end instead of being stored twice.
+    # The oldest texts are evicted once there are more than max_entries, or their total length is above max_chars.
+    # Added to from the reader thread and navigated from the main thread, hence the lock.
+    def __init__(self, max_entries=100, max_chars=100000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.chars = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.position = None  # while reviewing, how many entries back from the newest
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, text, key=None):
+        if key is None:
+            key = text_key(text)
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None:
+                self.chars -= len(existing)
+            self.position = None
+            if len(text) > self.max_chars or self.max_entries <= 0:
+                return
+            self._entries[key] = text
+            self.chars += len(text)
+            self._evict()
+
+    def _evict(self):
+        entries = self._entries
+        while entries and (len(entries) > self.max_entries or self.chars > self.max_chars):
+            _key, text = entries.popitem(last=False)
+            self.chars -= len(text)
+
+    def resize(self, max_entries, max_chars):
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_chars = max_chars
+            self._evict()
+            self.position = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.chars = 0
+            self.position = None
+
+    def current(self):
+        # the entry being reviewed, or the newest one
+        with self._lock:
+            if not self._entries:
+                return None
+            return self._entry(self.position or 0)
+
+    def move(self, step):
+        # a positive step moves back to older entries. Returns None at either end, without moving.
+        with self._lock:
+            # the first step back reviews the newest entry
+            position = (0 if step > 0 else -1) if self.position is None else self.position + step
+            if not 0 <= position < len(self._entries):
+                return None
+            self.position = position
+            return self._entry(position)
+
+    def _entry(self, position):
+        # walks back from the newest entry instead of copying the history, reviewing stays near the newest
+        return next(itertools.islice(reversed(self._entries.values()), position, None))
@@ -0,0 +1,239 @@
+# historylog
+# an optional log of spoken clipboard texts on disk, written in compressed batches by a background thread.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# The log is a numbered series of files, history-000001.log, history-000002.log and so on.
+# Each log file is a sequence of zlib compressed batches, every batch is one JSON array of [timestamp, text] per line.
+# Next to each log file, an index file has one fixed size record per batch with the time of its first and last entry,
+# and its offset and size in the log, so entries around a time are found without reading the log,
+# and searches decompress one batch at a time, newest first, stopping once they have enough results.
+# A batch is only added to the index once it's completely written, so reading while the log is written is safe.
+
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+
+from logHandler import log
+
+from .stats import stats
+
+INDEX_RECORD = struct.Struct("<ddQI")
+MAX_PENDING = 1000  # entries waiting to be written, more are dropped rather than blocking
+_LOG_NAME_RE = re.compile(r"^history-(\d{6})\.log$")
+
+
+def default_log_directory():
+    # imported here so the log can be read and written outside of NVDA
+    import globalVars  # noqa: PLC0415
+
+    return os.path.join(globalVars.appArgs.configPath, "autoclip", "history")
+
+
+def _log_path(directory, number):
+    return os.path.join(directory, f"history-{number:06d}.log")
+
+
+def _index_path(directory, number):
+    return os.path.join(directory, f"history-{number:06d}.idx")
+
+
+def log_numbers(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(_LOG_NAME_RE.match, names) if match)
+
+
+def read_index(directory, number):
+    # returns a list of (first time, last time, offset, size), a partly written record at the end is left out
+    try:
+        with open(_index_path(directory, number), "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    return [
+        INDEX_RECORD.unpack_from(data, offset)
+        for offset in range(0, len(data) - INDEX_RECORD.size + 1, INDEX_RECORD.size)
+    ]
+
+
+def _read_batch(file, offset, size):
+    file.seek(offset)
+    lines = zlib.decompress(file.read(size)).decode("utf-8", "surrogatepass").split("\n")
+    return [tuple(json.loads(line)) for line in lines]
+
+
+def iter_batches(directory, start=None, end=None):
+    # yields lists of (timestamp, text) entries, newest batch first, only batches with entries between start and end
+    for number in reversed(log_numbers(directory)):
+        records = [
+            record
+            for record in read_index(directory, number)
+            if (start is None or record[1] >= start) and (end is None or record[0] <= end)
+        ]
+        if not records:
+            continue
+        try:
+            with open(_log_path(directory, number), "rb") as file:
+                for _first, _last, offset, size in reversed(records):
+                    yield _read_batch(file, offset, size)
+        except FileNotFoundError:  # removed by rotation in the meantime
+            continue
+
+
+def search(directory, query, limit=100):
+    # case insensitive, returns up to limit (timestamp, text) entries, newest first
+    query = query.casefold()
+    results = []
+    for batch in iter_batches(directory):
+        for entry in reversed(batch):
+            if query in entry[1].casefold():
+                results.append(entry)
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+def entries_between(directory, start, end=None):
+    # entries from start to end, oldest first
+    entries = []
+    for batch in iter_batches(directory, start, end):
+        entries[:0] = [
+            entry for entry in batch if entry[0] >= start and (end is None or entry[0] <= end)
+        ]
+    return entries
+
+
+class HistoryLog:
+    # add only puts the text on a queue, the writer thread collects entries until there are batch_size of them
+    # or flush_interval seconds went by since the first one, then compresses and appends them as one batch.
+    # A new file is started once a file would grow above max_file_size bytes, and the oldest files are
+    # deleted beyond max_files.
+    def __init__(
+        self,
+        directory,
+        max_file_size=4 * 1024 * 1024,
+        max_files=5,
+        batch_size=64,
+        flush_interval=5.0,
+    ):
+        self.directory = directory
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(MAX_PENDING)
+        self._thread = None
+        self._number = 0
+        self._log = None
+        self._index = None
+        self._offset = 0
+
+    def add(self, text, timestamp=None):
+        try:
+            self._queue.put_nowait((time.time() if timestamp is None else timestamp, text))
+        except queue.Full:
+            stats.count("historyLogDropped")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="Autoclip history log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # writes what's left
+        if not self._thread:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        batch = []
+        deadline = 0
+        while True:
+            try:
+                timeout = max(0, deadline - time.monotonic()) if batch else None
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # time to write the batch
+            if item is None:
+                break
+            if item:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (item is False or len(batch) >= self.batch_size):
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+        self._close()
+
+    def _write(self, batch):
+        start = stats.begin()
+        try:
+            payload = zlib.compress(
+                "\n".join(json.dumps(entry, ensure_ascii=False) for entry in batch).encode(
+                    "utf-8", "surrogatepass"
+                )
+            )
+            if self._log is None:
+                self._open()
+            elif self._offset and self._offset + len(payload) > self.max_file_size:
+                self._rotate()
+            self._log.write(payload)
+            self._log.flush()
+            self._index.write(
+                INDEX_RECORD.pack(batch[0][0], batch[-1][0], self._offset, len(payload))
+            )
+            self._index.flush()
+            self._offset += len(payload)
+        except OSError:
+            log.warning("Could not write the Autoclip history log", exc_info=True)
+            self._close()
+        stats.end("historyLogWrite", start)
+
+    def _open(self):
+        # continue the newest file, cutting anything written after its last indexed batch
+        os.makedirs(self.directory, exist_ok=True)
+        numbers = log_numbers(self.directory)
+        self._number = numbers[-1] if numbers else 1
+        records = read_index(self.directory, self._number)
+        self._offset = records[-1][2] + records[-1][3] if records else 0
+        # the files are kept open by the writer thread until the log is rotated or stopped
+        self._log = open(_log_path(self.directory, self._number), "ab")  # noqa: SIM115
+        self._log.truncate(self._offset)
+        self._index = open(_index_path(self.directory, self._number), "ab")  # noqa: SIM115
+        self._index.truncate(len(records) * INDEX_RECORD.size)
+
+    def _rotate(self):
+        self._close()
+        self._number += 1
+        self._offset = 0
+        self._log = open(_log_path(self.directory, self._number), "ab")  # noqa: SIM115
+        self._index = open(_index_path(self.directory, self._number), "ab")  # noqa: SIM115
+        for number in log_numbers(self.directory)[: -self.max_files]:
+            for path in (_log_path(self.directory, number), _index_path(self.directory, number)):
+                # one file that can't be removed shouldn't keep the others
+                try:
+                    os.remove(path)
+                except OSError:  # noqa: PERF203
+                    log.debugWarning("Could not remove %s", path, exc_info=True)
+
+    def _close(self):
+        for file in (self._log, self._index):
+            if file:
+                file.close()
+        self._log = None
+        self._index = None
@@ -0,0 +1,74 @@
+# linestream
+# finds the new lines of clipboard text that is appended to like a log.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import collections
+
+# characters per line guessed for the end of the text first split, it's doubled until it has enough lines
+LINE_LENGTH_GUESS = 80
+
+
+class LineStream:
+    # Remembers the hashes of the max_lines most recently seen lines, never the lines themselves.
+    # Only the last max_lines lines of a text are examined, found by splitting from its end,
+    # so the work for one update is bounded by max_lines however long the text grows.
+    # Lines still in the text are refreshed on every update, so they aren't forgotten while they're there.
+    def __init__(self, max_lines=1000):
+        self.max_lines = max_lines
+        self._seen = collections.OrderedDict()  # line hash: None, least recently seen first
+
+    def new_lines(self, text):
+        # returns the lines of text not seen recently, joined by newlines. Blank lines are skipped.
+        lines = self._last_lines(text)
+        seen = self._seen
+        new = []
+        added = []
+        for line in lines:
+            if not line or line.isspace():
+                continue
+            key = hash(line)
+            if key in seen:
+                seen.move_to_end(key)
+            else:
+                # a line repeated within the same update is new every time
+                new.append(line)
+                added.append(key)
+        for key in added:
+            seen[key] = None
+        while len(seen) > self.max_lines:
+            seen.popitem(last=False)
+        return "\n".join(new)
+
+    def _last_lines(self, text):
+        # Splitting the whole text would copy all of it before the last max_lines lines into the first
+        # part, so only its end is split, long enough to hold max_lines lines.
+        max_lines = self.max_lines
+        window = (max_lines + 1) * LINE_LENGTH_GUESS
+        while window < len(text):
+            tail = text[-window:]
+            if tail.count("\n") > max_lines:
+                break
+            window *= 2
+        else:
+            tail = text
+        lines = tail.rsplit("\n", max_lines)
+        if len(lines) > max_lines:
+            # the rest of the text before the last max_lines lines, or part of it
+            del lines[0]
+        return lines
+
+    def resize(self, max_lines):
+        self.max_lines = max_lines
+        while len(self._seen) > max_lines:
+            self._seen.popitem(last=False)
+
+    def clear(self):
+        self._seen.clear()
+
+    def __len__(self):
+        return len(self._seen)
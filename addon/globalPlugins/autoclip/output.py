@@ -0,0 +1,81 @@
+# output
+# hands clipboard text to speech and braille, each the way that suits it.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import time
+
+import braille
+import core
+import speech
+from speech.commands import CallbackCommand, EndUtteranceCommand
+
+from .stats import stats
+
+
+def _call_later(delay, func):
+    core.callLater(int(delay * 1000), func)
+
+
+class TextOutput:
+    # Speech is given chunks of text as one speech sequence per call, with an end of utterance between
+    # chunks so the synthesizer still speaks each one separately. Braille shows the whole text
+    # of a clipboard update once, instead of a message per chunk overwriting the previous one.
+    # Braille messages are at least braille_interval seconds apart, texts shown in between are coalesced
+    # and only the latest one is shown once the interval is over.
+    # call_later(delay, func) must run func on the main thread after delay seconds. Like clock,
+    # it can be replaced to use the output without NVDA's main loop.
+    def __init__(self, braille_interval=0.1, call_later=_call_later, clock=time.monotonic):
+        self.braille_interval = braille_interval
+        self.call_later = call_later
+        self.clock = clock
+        self._last_braille = None  # time of the last braille message
+        self._pending_braille = None  # text to show once the interval is over
+
+    def speak(self, chunks, on_done=None):
+        # on_done is called by the speech manager once the last chunk was spoken
+        sequence = []
+        for chunk in chunks:
+            if sequence:
+                sequence.append(EndUtteranceCommand())
+            sequence.append(chunk)
+        if on_done is not None:
+            sequence.append(CallbackCommand(on_done, name="autoclip.chunkDone"))
+        speech.speak(sequence)
+
+    def show(self, text):
+        if self._pending_braille is not None:
+            # already waiting for the interval to be over
+            self._pending_braille = text
+            stats.count("brailleCoalesced")
+            return
+        now = self.clock()
+        if self._last_braille is not None:
+            wait = self._last_braille + self.braille_interval - now
+            if wait > 0:
+                self._pending_braille = text
+                self.call_later(wait, self._flush)
+                return
+        self._show(text, now)
+
+    def message(self, text):
+        # like ui.message
+        self.speak((text,))
+        self.show(text)
+
+    def cancel(self):
+        # drops a braille message waiting for the interval
+        self._pending_braille = None
+
+    def _flush(self):
+        text, self._pending_braille = self._pending_braille, None
+        if text is not None:
+            self._show(text, self.clock())
+
+    def _show(self, text, now):
+        self._last_braille = now
+        braille.handler.message(text)
@@ -0,0 +1,105 @@
+# pacing
+# hands chunks of text to speech a few at a time, as previously queued chunks finish being spoken.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import collections
+import time
+
+# how long chunks are handed to speech at once when there is no lookahead, before letting other events run
+TIME_SLICE = 0.01
+# A chunk whose on_done has not been called after this long is taken as spoken, as speech never calls it
+# when speech is off or in beeps mode, or when speech was canceled on NVDA versions not reporting cancels.
+# Generous enough to not cut a chunk spoken at a slow rate.
+WATCHDOG_DELAY = 2.0
+WATCHDOG_DELAY_PER_CHARACTER = 0.1
+
+
+class ChunkPacer:
+    # speak is called as speak(chunks, on_done) with a list of chunks to speak as one speech sequence,
+    # and must arrange for on_done to be called once they have been spoken.
+    # At most lookahead chunks are handed to speech at a time, one per call.
+    # With a lookahead of 0, all chunks are handed to speech right away with on_done set to None,
+    # but splitting a large text is spread over several calls of schedule, so the first chunk is spoken
+    # without waiting for the rest of the text to be split, and other events are handled in between.
+    # The chunks split in one time slice after the first are spoken as a single sequence.
+    # call_later(delay, func), when given, runs the watchdog of each chunk handed to speech with a lookahead.
+    # Not thread safe, all methods, on_done and call_later are expected to be called on the same thread.
+    def __init__(self, speak, lookahead=1, schedule=None, call_later=None):
+        self.speak = speak
+        self.lookahead = lookahead
+        self.schedule = schedule
+        self.call_later = call_later
+        self._sources = collections.deque()
+        self._in_flight = set()  # tokens of the chunks handed to speech and not spoken yet
+        self._last_token = 0
+        self._resume_pending = False
+
+    @property
+    def busy(self):
+        return bool(self._in_flight or self._sources)
+
+    def add(self, chunks):
+        # chunks can be a lazy iterable, it's only advanced when speech is ready for more.
+        self._sources.append(iter(chunks))
+        self._fill()
+
+    def cancel(self):
+        # forget everything not yet spoken, on_done callbacks of already queued chunks are ignored.
+        self._sources.clear()
+        self._in_flight.clear()
+
+    def _fill(self):
+        if not self.lookahead:
+            self._fill_all()
+            return
+        while len(self._in_flight) < self.lookahead and self._sources:
+            chunk = next(self._sources[0], None)
+            if chunk is None:
+                self._sources.popleft()
+                continue
+            self._last_token += 1
+            token = self._last_token
+            self._in_flight.add(token)
+            self.speak([chunk], lambda token=token: self._on_done(token))
+            if self.call_later:
+                delay = WATCHDOG_DELAY + len(chunk) * WATCHDOG_DELAY_PER_CHARACTER
+                self.call_later(delay, lambda token=token: self._on_done(token))
+
+    def _fill_all(self):
+        deadline = time.perf_counter() + TIME_SLICE
+        batch = []
+        spoken_first = False
+        while self._sources:
+            chunk = next(self._sources[0], None)
+            if chunk is None:
+                self._sources.popleft()
+                continue
+            if spoken_first:
+                batch.append(chunk)
+            else:
+                self.speak([chunk], None)
+                spoken_first = True
+            if self.schedule and self._sources and time.perf_counter() >= deadline:
+                if not self._resume_pending:
+                    self._resume_pending = True
+                    self.schedule(self._resume)
+                break
+        if batch:
+            self.speak(batch, None)
+
+    def _resume(self):
+        # anything canceled in the meantime is already gone from the sources
+        self._resume_pending = False
+        self._fill()
+
+    def _on_done(self, token):
+        # called when the chunk was spoken or by its watchdog, whichever comes first
+        if token not in self._in_flight:
+            return
+        self._in_flight.discard(token)
+        self._fill()
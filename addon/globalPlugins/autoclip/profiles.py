@@ -0,0 +1,69 @@
+# profiles
+# settings of the clipboard watcher, with overrides for the application owning the clipboard.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# Overrides are read from the [[apps]] section of the Autoclip configuration, one subsection per application
+# named after its executable without the extension, in lowercase, the same as NVDA app module names:
+# [autoclip]
+#     [[apps]]
+#         [[[mygame]]]
+#             chunkSize = 200
+#             interrupt = True
+# Keys left unset use the global setting. Everything is resolved once when the configuration is loaded.
+
+from typing import NamedTuple
+
+
+class Settings(NamedTuple):
+    interrupt: bool
+    chunk_size: int
+    max_length: int
+    debounce_delay: float  # seconds
+    interrupt_delay: float  # seconds
+
+
+# configuration key, Settings field, and the divisor converting the configured value
+SETTING_KEYS = (
+    ("interrupt", "interrupt", None),
+    ("chunkSize", "chunk_size", None),
+    ("maxLength", "max_length", None),
+    ("debounceDelay", "debounce_delay", 1000),
+    ("interruptDelay", "interrupt_delay", 1000),
+)
+
+app_confspec = {key: "integer(default=None)" for key, _field, _divisor in SETTING_KEYS}
+app_confspec["interrupt"] = "boolean(default=None)"
+
+
+def _read_settings(section, base=None):
+    # values missing from section, or None, are taken from base
+    values = {}
+    for key, field, divisor in SETTING_KEYS:
+        try:
+            value = section[key]
+        except KeyError:
+            continue
+        if value is None:
+            continue
+        values[field] = value / divisor if divisor else value
+    if base is None:
+        return Settings(**values)
+    return base._replace(**values) if values else base
+
+
+def load_settings(conf):
+    # returns the global settings, and a dictionary of application name to settings
+    settings = _read_settings(conf)
+    apps = {}
+    try:
+        sections = conf["apps"].items()
+    except KeyError:
+        sections = ()
+    for name, section in sections:
+        apps[name.lower()] = _read_settings(section, settings)
+    return settings, apps
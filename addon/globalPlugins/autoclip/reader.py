@@ -0,0 +1,157 @@
+# reader
+# background stage that reads the clipboard after update notifications, keeping the window proc cheap.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import collections
+import random
+import threading
+import time
+
+from logHandler import log
+
+from .stats import stats
+
+DEFAULT_MAX_PENDING = 8
+
+
+class RetryPolicy:
+    # Exponential backoff with jitter, used when the clipboard is held open by another program.
+    # Each delay is reduced by a random part of up to jitter times itself,
+    # so readers retrying at the same time spread out.
+    def __init__(
+        self, initial_delay=0.005, max_delay=0.2, budget=1.0, jitter=0.5, rand=random.random
+    ):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.budget = budget  # total seconds of delays before giving up
+        self.jitter = jitter
+        self.rand = rand
+
+    def delays(self):
+        delay = self.initial_delay
+        total = 0.0
+        while total < self.budget:
+            actual = delay * (1 - self.jitter * self.rand())
+            total += actual
+            yield actual
+            delay = min(delay * 2, self.max_delay)
+
+
+class ClipboardReader:
+    # The window proc only calls post, which records the latest sequence number and wakes the worker.
+    # Several posts that arrive while the worker is busy are coalesced into a single read.
+    # If settle_delay is set, it's called after each wake up, and the worker waits that many seconds
+    # before reading, so a burst of updates is coalesced as well.
+    def __init__(self, read, settle_delay=None):
+        self.read = read
+        self.settle_delay = settle_delay
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._pending = False
+        self._sequence = 0
+        self._retry_at = None
+        self._retry_sequence = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="autoclip.ClipboardReader", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def post(self, sequence=0):
+        with self._lock:
+            self._pending = True
+            self._sequence = sequence
+        self._wake.set()
+
+    def retry(self, sequence, delay):
+        # reads again after delay seconds, unless a new update arrives first
+        with self._lock:
+            self._retry_at = time.monotonic() + delay
+            self._retry_sequence = sequence
+
+    def _timeout(self):
+        with self._lock:
+            if self._retry_at is None:
+                return None
+            return max(0, self._retry_at - time.monotonic())
+
+    def _take(self):
+        with self._lock:
+            if self._pending:
+                self._pending = False
+                self._retry_at = None
+                return self._sequence
+            if self._retry_at is not None and time.monotonic() >= self._retry_at:
+                self._retry_at = None
+                return self._retry_sequence
+            return None
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._timeout())
+            self._wake.clear()
+            if not self._running:
+                break
+            if self.settle_delay:
+                delay = self.settle_delay()
+                if delay > 0 and self._stopped.wait(delay):
+                    break
+            sequence = self._take()
+            if sequence is None:
+                continue
+            try:
+                self.read(sequence)
+            except Exception:
+                log.exception("Error while reading the clipboard")
+
+
+class DropOldestQueue:
+    # bounded hand-off between the reader thread and speech, when full the oldest item is discarded.
+    def __init__(self, max_length=DEFAULT_MAX_PENDING):
+        self._items = collections.deque(maxlen=max_length)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        # returns True if the queue was empty, so the caller knows it must schedule a drain.
+        with self._lock:
+            was_empty = not self._items
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                stats.count("queueDropped")
+            self._items.append(item)
+            return was_empty
+
+    def get(self):
+        with self._lock:
+            return self._items.popleft() if self._items else None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
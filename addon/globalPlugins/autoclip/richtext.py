@@ -0,0 +1,259 @@
+# richtext
+# single pass conversion of HTML and RTF clipboard formats to speakable text.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# Both converters stop as soon as the text is longer than max_length and return an empty string,
+# the same as for plain text that is too long, so a huge document costs at most max_length characters of work
+# after the markup read from the clipboard, which is itself limited to MAX_MARKUP_RATIO bytes per character.
+
+import codecs
+import html
+import re
+
+MAX_MARKUP_RATIO = 8
+
+_HTML_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|$)|<(/?)([a-zA-Z][\w:-]*)(?:[^>\"']|\"[^\"]*\"|'[^']*')*>?|<[!?][^>]*>?",
+    re.DOTALL,
+)
+_HTML_SKIPPED_RE = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+    "head": re.compile(r"</head\s*>", re.IGNORECASE),
+}
+_HTML_BLOCK_TAGS = frozenset(
+    (
+        "address",
+        "article",
+        "blockquote",
+        "br",
+        "dd",
+        "div",
+        "dl",
+        "dt",
+        "footer",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "hr",
+        "li",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "table",
+        "td",
+        "th",
+        "tr",
+        "ul",
+    )
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+_CF_HTML_OFFSET_RE = re.compile(
+    rb"^(StartFragment|EndFragment|StartHTML|EndHTML):(-?\d+)", re.MULTILINE
+)
+
+
+class _Output:
+    # collects text parts while keeping track of the length, so conversion can stop at the budget
+    def __init__(self, max_length):
+        self.parts = []
+        self.length = 0
+        self.max_length = max_length
+        self.at_line_start = True
+
+    def add(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+        self.at_line_start = text.endswith("\n")
+        return self.max_length is not None and self.length > self.max_length
+
+    def new_line(self):
+        if not self.at_line_start:
+            return self.add("\n")
+        return False
+
+    def text(self):
+        return "".join(self.parts).strip()
+
+
+def html_to_text(markup, max_length=None):
+    output = _Output(max_length)
+    position = 0
+    length = len(markup)
+    while position < length:
+        match = _HTML_TOKEN_RE.search(markup, position)
+        end = match.start() if match else length
+        if max_length is not None:
+            # a long run of text is converted in pieces, so going over the budget is noticed early
+            end = min(end, position + (max_length - output.length + 1) * MAX_MARKUP_RATIO)
+        if end > position:
+            text = _WHITESPACE_RE.sub(" ", html.unescape(markup[position:end]))
+            if output.at_line_start:
+                text = text.lstrip()
+            if text and output.add(text):
+                return ""
+        if not match or end < match.start():
+            position = end
+            continue
+        position = match.end()
+        tag = match.group(2)
+        if not tag:
+            continue
+        tag = tag.lower()
+        closing = match.group(1)
+        if not closing and tag in _HTML_SKIPPED_RE:
+            skipped = _HTML_SKIPPED_RE[tag].search(markup, position)
+            position = skipped.end() if skipped else length
+        elif tag in _HTML_BLOCK_TAGS and output.new_line():
+            return ""
+    return output.text()
+
+
+def cf_html_to_text(data, max_length=None):
+    # The "HTML Format" clipboard format is UTF-8 with a header giving byte offsets of the copied fragment.
+    offsets = dict(_CF_HTML_OFFSET_RE.findall(data[:1024]))
+    start = int(offsets.get(b"StartFragment", offsets.get(b"StartHTML", 0)))
+    end = int(offsets.get(b"EndFragment", offsets.get(b"EndHTML", len(data))))
+    if start < 0 or end < 0:
+        start, end = 0, len(data)
+    return html_to_text(data[start:end].decode("utf-8", "replace"), max_length)
+
+
+_RTF_TOKEN_RE = re.compile(
+    r"\\([a-zA-Z]+)(-?\d+)? ?|\\'([0-9a-fA-F]{2})|\\(.)|([{}])|[\r\n]+|([^\\{}\r\n]+)",
+    re.DOTALL,
+)
+# groups whose content is not text
+_RTF_SKIPPED_DESTINATIONS = frozenset(
+    (
+        "colortbl",
+        "fonttbl",
+        "footer",
+        "footnote",
+        "header",
+        "info",
+        "object",
+        "pict",
+        "stylesheet",
+    )
+)
+_RTF_CHARACTERS = {
+    "par": "\n",
+    "line": "\n",
+    "row": "\n",
+    "sect": "\n",
+    "page": "\n",
+    "tab": "\t",
+    "cell": "\t",
+    "emdash": "\u2014",
+    "endash": "\u2013",
+    "bullet": "\u2022",
+    "lquote": "\u2018",
+    "rquote": "\u2019",
+    "ldblquote": "\u201c",
+    "rdblquote": "\u201d",
+}
+
+
+# text of control symbols, \\ \{ \} are escaped characters and \~ a non-breaking space
+_RTF_SYMBOLS = {
+    "\\": "\\",
+    "{": "{",
+    "}": "}",
+    "~": "\u00a0",
+    "\r": "\n",
+    "\n": "\n",
+}
+
+
+def _rtf_encoding(code_page, default):
+    candidate = f"cp{code_page}"
+    try:
+        codecs.lookup(candidate)
+    except LookupError:
+        return default
+    return candidate
+
+
+class _RtfParser:
+    # feed is called with every token, and like the methods it calls,
+    # returns True once the text is longer than max_length.
+    def __init__(self, max_length):
+        self.output = _Output(max_length)
+        self.encoding = "cp1252"
+        self.skip = False  # inside a group that is not text
+        self.unicode_skip = 1  # characters following \u that are an ANSI fallback
+        self.pending_skip = 0
+        self.stack = []
+
+    def feed(self, match):
+        word, argument, hex_byte, symbol, brace, text = match.groups()
+        if brace is not None:
+            self._brace(brace)
+            return False
+        if match.lastindex is None:
+            return False  # line breaks in RTF source are not text
+        if self.pending_skip:
+            # the ANSI fallback of a \u character, a text run only loses its first characters
+            if text is None or len(text) <= self.pending_skip:
+                self.pending_skip = max(self.pending_skip - (1 if text is None else len(text)), 0)
+                return False
+            text = text[self.pending_skip :]
+            self.pending_skip = 0
+        if word is not None:
+            return self._control_word(word, argument)
+        if symbol is not None:
+            return self._symbol(symbol)
+        if hex_byte is not None:
+            text = bytes((int(hex_byte, 16),)).decode(self.encoding, "replace")
+        return not self.skip and bool(text) and self.output.add(text)
+
+    def _brace(self, brace):
+        if brace == "{":
+            self.stack.append((self.skip, self.unicode_skip))
+            return
+        if self.stack:
+            self.skip, self.unicode_skip = self.stack.pop()
+        self.pending_skip = 0
+
+    def _control_word(self, word, argument):
+        if word in _RTF_SKIPPED_DESTINATIONS:
+            self.skip = True
+        elif word == "ansicpg" and argument:
+            self.encoding = _rtf_encoding(argument, self.encoding)
+        elif word == "uc" and argument:
+            self.unicode_skip = int(argument)
+        elif self.skip:
+            return False
+        elif word == "u" and argument:
+            code = int(argument)
+            self.pending_skip = self.unicode_skip
+            return self.output.add(chr(code + 65536 if code < 0 else code))
+        elif word in _RTF_CHARACTERS:
+            return self.output.add(_RTF_CHARACTERS[word])
+        return False
+
+    def _symbol(self, symbol):
+        if symbol == "*":
+            self.skip = True
+            return False
+        text = _RTF_SYMBOLS.get(symbol)
+        return not self.skip and text is not None and self.output.add(text)
+
+
+def rtf_to_text(data, max_length=None):
+    parser = _RtfParser(max_length)
+    for match in _RTF_TOKEN_RE.finditer(data.decode("latin-1")):
+        if parser.feed(match):
+            return ""
+    return parser.output.text()
@@ -0,0 +1,134 @@
+# rules
+# user defined rules removing or rewriting parts of the clipboard text before it's spoken.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# Ignore patterns drop every line they match, and replacements are written as "pattern => replacement",
+# the replacement can refer to groups of the pattern like re.sub, and without a replacement matches are removed.
+# All patterns of a kind are compiled into a single regular expression, so each line is scanned once
+# no matter how many rules there are. Where replacements match at the same position the first one wins,
+# and text produced by a replacement is not matched again.
+
+import re
+import time
+
+from logHandler import log
+
+from .stats import stats
+
+REPLACEMENT_SEPARATOR = " => "
+# backreferences inside a pattern would point to the wrong group once patterns are combined
+_BACKREFERENCE_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def parse_replacement(rule):
+    pattern, _separator, replacement = rule.partition(REPLACEMENT_SEPARATOR)
+    return pattern, replacement
+
+
+def find_invalid_rule(ignore_patterns, replacements):
+    # returns (rule, error) for the first rule that doesn't compile, or None
+    for rule, pattern in [(pattern, pattern) for pattern in ignore_patterns] + [
+        (rule, parse_replacement(rule)[0]) for rule in replacements
+    ]:
+        # only run when settings are saved, and each rule needs its own error
+        try:
+            re.compile(pattern)
+        except re.error as e:  # noqa: PERF203
+            return rule, e
+    return None
+
+
+def _compile(pattern):
+    try:
+        return re.compile(pattern)
+    except re.error:
+        log.warning("Ignoring invalid Autoclip rule pattern %r", pattern, exc_info=True)
+        return None
+
+
+def _combine(patterns):
+    # None if the patterns can't be combined, such as with inline flags or repeated group names
+    for pattern in patterns:
+        if pattern.flags & ~re.UNICODE or _BACKREFERENCE_RE.search(pattern.pattern):
+            return None
+    try:
+        # capturing groups here would keep the regular expression engine from scanning for literal prefixes
+        return re.compile("|".join(f"(?:{pattern.pattern})" for pattern in patterns))
+    except re.error:
+        return None
+
+
+class TextRules:
+    # time_budget is the time in seconds apply can spend on one text.
+    # Rules are applied a line at a time and lines left once it's spent are kept as they are,
+    # so a slow pattern delays one update by about the time it takes on a single line, not the whole text.
+    def __init__(self, ignore_patterns=(), replacements=(), time_budget=0.05):
+        self.time_budget = time_budget
+        self.timed_out = False
+        self.ignore = [pattern for pattern in map(_compile, ignore_patterns) if pattern]
+        self.replacements = []  # (pattern, replacement)
+        for rule in replacements:
+            pattern, replacement = parse_replacement(rule)
+            pattern = _compile(pattern)
+            if pattern:
+                self.replacements.append((pattern, replacement))
+        # when patterns can't be combined, they are applied one after the other
+        self.combined_ignore = _combine(self.ignore) if self.ignore else None
+        self.combined_replace = (
+            _combine([pattern for pattern, _replacement in self.replacements])
+            if self.replacements
+            else None
+        )
+
+    def __bool__(self):
+        return bool(self.ignore or self.replacements)
+
+    def _is_ignored(self, line):
+        if self.combined_ignore is not None:
+            return self.combined_ignore.search(line) is not None
+        return any(pattern.search(line) for pattern in self.ignore)
+
+    def _expand(self, match):
+        # the first rule matching where the combined pattern matched is the one the alternation chose
+        for pattern, template in self.replacements:
+            own_match = pattern.match(match.string, match.start())
+            if own_match:
+                return own_match.expand(template)
+        return match.group()
+
+    def _replace(self, line):
+        if self.combined_replace is not None:
+            return self.combined_replace.sub(self._expand, line)
+        for pattern, template in self.replacements:
+            line = pattern.sub(template, line)
+        return line
+
+    def apply(self, text):
+        # returns the text with ignored lines removed and replacements made, empty if every line was ignored
+        if not self:
+            return text
+        start = stats.begin()
+        deadline = time.perf_counter() + self.time_budget
+        lines = text.split("\n")
+        result = []
+        for index, line in enumerate(lines):
+            if time.perf_counter() > deadline:
+                stats.count("rulesTimeouts")
+                if not self.timed_out:
+                    self.timed_out = True
+                    log.warning(
+                        "Autoclip rules took longer than %d ms, the rest of the text was left unchanged",
+                        self.time_budget * 1000,
+                    )
+                result.extend(lines[index:])
+                break
+            if self.ignore and self._is_ignored(line):
+                continue
+            result.append(self._replace(line) if self.replacements else line)
+        stats.end("rules", start)
+        return "\n".join(result)
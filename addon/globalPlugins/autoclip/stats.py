@@ -0,0 +1,94 @@
+# stats
+# counters and duration histograms of the clipboard reading pipeline, collected only when enabled.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import time
+
+from logHandler import log
+
+# bucket i counts durations from 2**(i - 1) up to 2**i microseconds, the last bucket counts anything longer.
+BUCKET_COUNT = 24
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "max", "total")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        microseconds = int(seconds * 1_000_000)
+        self.buckets[min(microseconds.bit_length(), BUCKET_COUNT - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        # upper bound of the bucket the percentile falls in, in seconds
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min((1 << index) / 1_000_000, self.max)
+        return self.max
+
+
+class Stats:
+    # Call sites stay cheap when disabled: count returns right away, and begin returns 0,
+    # which makes end a no-op, so no clock is read.
+    # Updated from several threads without a lock, so the numbers are approximate.
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def begin(self):
+        return time.perf_counter() if self.enabled else 0
+
+    def end(self, stage, start):
+        if not start:
+            return
+        self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        # for durations measured in several parts, such as splitting text lazily
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.add(seconds)
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def summary(self):
+        # empty if nothing was collected
+        lines = [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+        for stage, histogram in sorted(self.histograms.items()):
+            lines.append(
+                f"{stage}: {histogram.count} calls, "
+                f"average {histogram.total / histogram.count * 1000:.3f} ms, "
+                f"p50 {histogram.percentile(0.5) * 1000:.3f} ms, "
+                f"p99 {histogram.percentile(0.99) * 1000:.3f} ms, "
+                f"max {histogram.max * 1000:.3f} ms"
+            )
+        return "\n".join(lines)
+
+    def dump(self):
+        log.info("Autoclip statistics:\n%s", self.summary())
+
+
+stats = Stats()
@@ -0,0 +1,61 @@
+# textdiff
+# finds the part of a clipboard text that changed compared to the previous one.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import difflib
+
+# The real diff is quadratic in the worst case, when more lines or words than this differ
+# after trimming the common prefix and suffix, all of the differing new part is returned instead.
+MAX_DIFF_UNITS = 400
+
+
+def _split(text, multiline):
+    return text.split("\n") if multiline else text.split()
+
+
+def _is_boundary(characters, multiline):
+    if multiline:
+        return "\n" in characters
+    return characters[0].isspace() or characters[1].isspace()
+
+
+def changed_text(old, new, max_units=MAX_DIFF_UNITS):
+    # Multi-line texts are compared line by line, single lines word by word.
+    # Returns only the parts of new that were appended, inserted or replaced, or an empty string.
+    if not old:
+        return new
+    multiline = "\n" in old or "\n" in new
+    if new.startswith(old):
+        # fast path, the text was only appended to,
+        # unless the appended part continues the last line or word, "10" becoming "100".
+        appended = new[len(old) :]
+        if not appended or _is_boundary(old[-1] + appended[0], multiline):
+            return appended
+
+    old_units = _split(old, multiline)
+    new_units = _split(new, multiline)
+    limit = min(len(old_units), len(new_units))
+    start = 0
+    while start < limit and old_units[start] == new_units[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old_units[-1 - end] == new_units[-1 - end]:
+        end += 1
+    old_units = old_units[start : len(old_units) - end]
+    new_units = new_units[start : len(new_units) - end]
+
+    if old_units and len(old_units) <= max_units and len(new_units) <= max_units:
+        matcher = difflib.SequenceMatcher(None, old_units, new_units, autojunk=False)
+        changed = [
+            unit
+            for tag, _i1, _i2, j1, j2 in matcher.get_opcodes()
+            if tag in ("replace", "insert")
+            for unit in new_units[j1:j2]
+        ]
+        new_units = changed
+    return ("\n" if multiline else " ").join(new_units)
@@ -0,0 +1,285 @@
+# trace
+# records clipboard update traces, and replays them through the clipboard watcher to measure its behavior.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# A trace is a text file with a header line, then one line per clipboard notification:
+# timestamp<TAB>length<TAB>hash[<TAB>text as a JSON string]
+# The length is -1 for an update without text. The text is only present if recording text was enabled,
+# otherwise replay uses a placeholder of the same length, identical for identical hashes.
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+from .backends import ReplayBackend, SimulatedClock
+from .watcher import (
+    UPDATE_DUPLICATE,
+    UPDATE_IGNORED,
+    UPDATE_QUEUED,
+    UPDATE_SKIPPED,
+    UPDATE_UNCHANGED,
+    ClipboardWatcher,
+)
+
+TRACE_HEADER = "# autoclip trace 1"
+# seconds before a function queued for the main thread runs when replaying, NVDA handles its event queue
+# every few milliseconds when it's not busy
+DEFAULT_MAIN_THREAD_DELAY = 0.01
+# fields of a trace line are the timestamp, the text length, its digest, and the text if it was recorded
+_TEXT_FIELD = 3
+
+
+def text_digest(text):
+    # unlike hash(), stable between NVDA sessions
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).hexdigest()
+
+
+def default_trace_path():
+    # imported here so traces can be replayed outside of NVDA
+    import globalVars  # noqa: PLC0415
+
+    directory = os.path.join(globalVars.appArgs.configPath, "autoclip", "traces")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, time.strftime("trace-%Y%m%d-%H%M%S.tsv"))
+
+
+class TraceRecorder:
+    # notified is called for every clipboard notification, read once the reader has read the clipboard.
+    # Notifications coalesced into one read are all written with the text of that read.
+    def __init__(self, path, include_text=False):
+        self.path = path
+        self.include_text = include_text
+        # kept open while recording, closed by close
+        self._file = open(path, "w", encoding="utf-8", newline="\n")  # noqa: SIM115
+        self._file.write(TRACE_HEADER + "\n")
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last = "-1\t"
+
+    def notified(self, timestamp):
+        with self._lock:
+            self._pending.append(timestamp)
+
+    def read(self, text):
+        # None means the clipboard has no text
+        if text is None:
+            fields = "-1\t"
+        else:
+            fields = f"{len(text)}\t{text_digest(text)}"
+            if self.include_text:
+                fields += "\t" + json.dumps(text, ensure_ascii=False)
+        self._last = fields
+        self._write(fields)
+
+    def unchanged(self):
+        self._write(self._last)
+
+    def _write(self, fields):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._file:
+                self._file.writelines(f"{timestamp:.6f}\t{fields}\n" for timestamp in pending)
+
+    def close(self):
+        with self._lock:
+            file, self._file = self._file, None
+        if file:
+            file.close()
+
+
+def _placeholder(length, digest):
+    if not length:
+        return ""
+    return ((digest + " ") * (length // (len(digest) + 1) + 1))[:length]
+
+
+def load_trace(path):
+    # returns a list of (timestamp, text) updates, text is None for an update without text
+    updates = []
+    with open(path, encoding="utf-8") as file:
+        if file.readline().rstrip("\n") != TRACE_HEADER:
+            raise ValueError(f"{path} is not an autoclip trace")
+        for line in file:
+            fields = line.rstrip("\n").split("\t", _TEXT_FIELD)
+            timestamp, length = float(fields[0]), int(fields[1])
+            if length < 0:
+                text = None
+            elif len(fields) > _TEXT_FIELD:
+                text = json.loads(fields[_TEXT_FIELD])
+            else:
+                text = _placeholder(length, fields[2])
+            updates.append((timestamp, text))
+    return updates
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class ReplayReport:
+    def __init__(self):
+        self.updates = 0
+        self.coalesced = 0  # notifications read together with a later one
+        self.skipped = 0  # unchanged sequence number or no text
+        self.ignored = 0  # empty, too long, or removed by rules
+        self.duplicates = 0
+        self.unchanged = 0
+        self.queued = 0
+        self.spoken = 0
+        self.stale = 0  # dropped as newer text was queued, when speaking the latest text only
+        self.queue_dropped = 0  # pushed out of the full queue by newer text
+        self.latencies = []  # simulated seconds between a notification and its text being handed to speech
+        self.processing = []  # real seconds spent on each read, and on handing each text to speech
+
+    @property
+    def dropped(self):
+        return self.queued - self.spoken
+
+    def summary(self):
+        return (
+            f"{self.updates} updates, {self.coalesced} coalesced, {self.skipped} skipped, "
+            f"{self.ignored} ignored, {self.duplicates} duplicates, {self.unchanged} without changes, "
+            f"{self.queued} queued, {self.spoken} spoken, {self.dropped} dropped "
+            f"({self.stale} stale, {self.queue_dropped} pushed out of the queue). "
+            f"Latency p50 {percentile(self.latencies, 0.5) * 1000:.3f} ms, "
+            f"p90 {percentile(self.latencies, 0.9) * 1000:.3f} ms, "
+            f"p99 {percentile(self.latencies, 0.99) * 1000:.3f} ms, "
+            f"max {percentile(self.latencies, 1) * 1000:.3f} ms. "
+            f"Processing p50 {percentile(self.processing, 0.5) * 1000:.3f} ms, "
+            f"max {percentile(self.processing, 1) * 1000:.3f} ms"
+        )
+
+
+class _ReplayReader:
+    # Takes the place of the reader thread in simulated time. A notification wakes it, it waits for the
+    # coalescing delay, then reads the clipboard as it is by then, so notifications in between are
+    # coalesced into that read.
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self._sequence = None  # posted since the last read
+        self._notified_at = 0.0
+
+    def post(self, sequence=0):
+        watcher = self.watcher
+        if self._sequence is not None:
+            watcher.report.coalesced += 1
+        else:
+            watcher.at(watcher.clock() + watcher.coalesce_delay(), self._read)
+        self._sequence = sequence
+        self._notified_at = watcher.clock()
+
+    def retry(self, sequence, delay):
+        watcher = self.watcher
+        watcher.at(watcher.clock() + delay, watcher.read, sequence)
+
+    def stop(self):
+        self._sequence = None
+
+    def _read(self):
+        sequence, self._sequence = self._sequence, None
+        if sequence is not None:
+            self.watcher.read(sequence, self._notified_at)
+
+
+class ReplayWatcher(ClipboardWatcher):
+    # Replays the updates of a trace in simulated time on the calling thread, and hands text to a counter
+    # instead of speech. Functions queued for the main thread run main_thread_delay simulated seconds later,
+    # so newer text can make queued text stale or push it out of the queue meanwhile, like in NVDA.
+    # Latency is in simulated time, from a notification to its text being handed to speech, so it
+    # reflects the coalescing, debounce and interrupt settings. Processing is measured in real time.
+    def __init__(self, updates, conf, main_thread_delay=DEFAULT_MAIN_THREAD_DELAY):
+        self.clock = SimulatedClock()
+        self.report = ReplayReport()
+        self.conf = conf
+        self.main_thread_delay = main_thread_delay
+        self._events = []  # heap of (simulated time, order, func, args)
+        self._order = itertools.count()
+        self._notified = {}  # generation of queued text: time of its notification
+        super().__init__(ReplayBackend(updates, self.clock), self.clock)
+
+    def load_config(self, conf=None):
+        super().load_config(self.conf if conf is None else conf)
+
+    def at(self, when, func, *args):
+        heapq.heappush(self._events, (when, next(self._order), func, args))
+
+    def schedule(self, func, *args):
+        self.at(self.clock() + self.main_thread_delay, func, *args)
+
+    def notify(self):
+        self.report.updates += 1
+        super().notify()
+
+    def read(self, sequence, notified_at=None):
+        start = time.perf_counter()
+        outcome = super().read(sequence)
+        self.report.processing.append(time.perf_counter() - start)
+        report = self.report
+        if outcome == UPDATE_QUEUED:
+            report.queued += 1
+            self._notified[self.generation] = self.clock() if notified_at is None else notified_at
+        elif outcome == UPDATE_SKIPPED:
+            report.skipped += 1
+        elif outcome == UPDATE_IGNORED:
+            report.ignored += 1
+        elif outcome == UPDATE_DUPLICATE:
+            report.duplicates += 1
+        elif outcome == UPDATE_UNCHANGED:
+            report.unchanged += 1
+        return outcome
+
+    def message_text(self, text, interrupt=False, generation=None, settings=None):
+        notified_at = self._notified.pop(generation, None)
+        if self.is_stale(generation):
+            self.report.stale += 1
+            return
+        start = time.perf_counter()
+        for _chunk in self.iter_chunks(text, settings.chunk_size if settings else None):
+            pass
+        self.report.processing.append(time.perf_counter() - start)
+        self.report.spoken += 1
+        if notified_at is not None:
+            self.report.latencies.append(self.clock() - notified_at)
+
+    def replay(self):
+        self.start(threaded=False)
+        self.reader = _ReplayReader(self)
+        for timestamp, text in self.backend.updates:
+            self.at(timestamp, self.backend.set_text, text)
+        try:
+            while self._events:
+                when, _order, func, args = heapq.heappop(self._events)
+                self.clock.now = max(self.clock.now, when)
+                func(*args)
+            self.report.queue_dropped = self.pending.dropped
+        finally:
+            self.stop()
+        return self.report
+
+
+def replay_trace(path, conf=None, main_thread_delay=DEFAULT_MAIN_THREAD_DELAY, **overrides):
+    # conf defaults to the current Autoclip configuration, overrides are configuration keys, for example:
+    # replay_trace(path, debounceDelay=200, chunkSize=300).summary()
+    if conf is None:
+        # imported here so traces can be replayed with a given configuration outside of NVDA
+        import config  # noqa: PLC0415
+
+        conf = config.conf["autoclip"]
+    conf = dict(conf.items())
+    conf.update(overrides)
+    # never record a trace of the replay itself, or log its texts
+    conf["recordTrace"] = False
+    conf["historyLog"] = False
+    return ReplayWatcher(load_trace(path), conf, main_thread_delay).replay()
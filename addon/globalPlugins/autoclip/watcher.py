@@ -0,0 +1,421 @@
+# watcher
+# the clipboard watcher, which reads clipboard updates and speaks them.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import threading
+import time
+
+import config
+import queueHandler
+import speech
+from logHandler import log
+
+from . import chunking
+from .adaptive import UpdateRateEstimator
+from .backends import SNAPSHOT_OPEN_FAILED, Win32Backend
+from .dedup import RecentHashes, text_key
+from .history import ClipboardHistory
+from .linestream import LineStream
+from .output import TextOutput
+from .pacing import ChunkPacer
+from .profiles import load_settings
+from .reader import ClipboardReader, DropOldestQueue, RetryPolicy
+from .rules import TextRules
+from .stats import stats
+from .textdiff import changed_text
+
+try:
+    from speech.extensions import speechCanceled
+except ImportError:  # older NVDA versions
+    speechCanceled = None
+
+# outcomes of reading a clipboard update
+UPDATE_SKIPPED = "skipped"  # the clipboard did not change or has no text, so it was not read
+UPDATE_RETRY = "retry"  # the clipboard could not be opened, reading is retried later
+UPDATE_IGNORED = "ignored"  # empty, only whitespace, too long, or removed by rules
+UPDATE_DUPLICATE = "duplicate"
+UPDATE_UNCHANGED = "unchanged"  # nothing new to speak when speaking changes only
+UPDATE_QUEUED = "queued"
+
+
+class ClipboardWatcher:
+    # backend defaults to the Win32 clipboard, clock to time.monotonic.
+    # Other backends and a simulated clock let the watcher run outside of Windows.
+    def __init__(self, backend=None, clock=time.monotonic):
+        self.state = False  # started
+        self.paused = False  # started, but clipboard updates are ignored
+        self.backend = backend if backend is not None else Win32Backend()
+        self.clock = clock
+        self.last_time = 0  # last time a clipboard notification was sent
+        self.recent = RecentHashes()  # recently spoken texts, to filter repeated updates
+        self.history = ClipboardHistory()
+        self.last_text = ""  # previous clipboard text, only kept when speaking changes only
+        self.lines = LineStream()  # recently seen lines, when speaking new lines only
+        self.last_sequence = 0  # clipboard sequence number of the last read
+        self.generation = 0  # incremented for every clipboard update that is going to be spoken
+        self.reader = None
+        self.recorder = None
+        self.history_log = None
+        self.retry_policy = RetryPolicy()
+        self._retry_delays = None  # delays left while retrying to open the clipboard
+        self._retry_attempts = 0
+        self._retry_started = 0
+        self.update_rate = UpdateRateEstimator()
+        self.pending = DropOldestQueue()
+        self.output = TextOutput()
+        self.pacer = ChunkPacer(
+            self.speak_chunks, schedule=self.schedule, call_later=self.output.call_later
+        )
+        self.settings = None  # settings used when no application overrides them
+        self.app_settings = {}  # application name: settings with its overrides applied
+        self.load_config()
+
+    def load_config(self, conf=None):
+        if conf is None:
+            conf = config.conf["autoclip"]
+        self.settings, self.app_settings = load_settings(conf)
+        self.split_at_word = conf["splitAtWordBounds"]
+        self.split_at_sentence = conf["splitAtSentenceBounds"]
+        self.splitter = chunking.get_splitter(self.split_at_word, self.split_at_sentence)
+        self.recent.size = conf["dedupHistorySize"]
+        self.history.resize(conf["historySize"], conf["historyMaxCharacters"])
+        self.rules = TextRules(
+            conf["ignorePatterns"], conf["replacements"], conf["rulesTimeBudget"] / 1000
+        )
+        self.pacer.lookahead = conf["speechLookahead"]
+        self.output.braille_interval = conf["brailleInterval"] / 1000
+        self.latest_only = conf["speakLatestOnly"]
+        self.changes_only = conf["speakChangesOnly"]
+        self.line_mode = conf["lineStream"]
+        self.lines.resize(conf["lineStreamLines"])
+        if not self.line_mode:
+            self.lines.clear()
+        self.adaptive = conf["adaptiveTiming"]
+        self.adaptive_min_delay = conf["adaptiveMinDelay"] / 1000
+        self.adaptive_max_delay = max(conf["adaptiveMaxDelay"] / 1000, self.adaptive_min_delay)
+        self.update_rate.max_interval = self.adaptive_max_delay * 2
+        if not self.changes_only:
+            self.last_text = ""
+        self.backend.read_rich_text = conf["readRichText"]
+        stats.enabled = conf["collectStatistics"]
+        self.record_trace = conf["recordTrace"]
+        self.record_trace_text = conf["recordTraceText"]
+        self.write_history_log = conf["historyLog"]
+        self.history_log_max_file_size = conf["historyLogMaxFileSize"] * 1024
+        self.history_log_max_files = conf["historyLogMaxFiles"]
+        if self.state:
+            self.update_recorder()
+            self.update_history_log()
+
+    @staticmethod
+    def split_text(text, chunk_size, split_at_word, split_at_sentence=False):
+        start = stats.begin()
+        chunks = chunking.split_text(
+            text, chunk_size, chunking.get_splitter(split_at_word, split_at_sentence)
+        )
+        stats.end("splitText", start)
+        return chunks
+
+    def iter_chunks(self, text, chunk_size=None):
+        # Splitting is lazy, the time spent on it is added up between chunks,
+        # and recorded once the text is split or speaking it stopped.
+        if chunk_size is None:
+            chunk_size = self.settings.chunk_size
+        bounds = iter(self.splitter(text, chunk_size))
+        elapsed = 0.0
+        try:
+            while True:
+                start = stats.begin()
+                chunk = next(bounds, None)
+                if start:
+                    elapsed += time.perf_counter() - start
+                if chunk is None:
+                    break
+                yield text[chunk[0] : chunk[1]]
+        finally:
+            if elapsed:
+                stats.add("splitText", elapsed)
+
+    def speak_chunks(self, chunks, on_done):
+        # braille is given the whole text by message_text, rather than every chunk
+        if on_done is None:
+            self.output.speak(chunks)
+            return
+        # the callback is run by the speech manager, move back to the event queue before touching the pacer.
+        self.output.speak(chunks, lambda: self.schedule(on_done))
+
+    def is_stale(self, generation):
+        # a newer clipboard update was queued after this one
+        return self.latest_only and generation is not None and generation != self.generation
+
+    def message_text(self, text, interrupt=False, generation=None, settings=None):
+        if self.is_stale(generation):
+            stats.count("stale")
+            return
+        if settings is None:
+            settings = self.settings
+        start = stats.begin()
+        if interrupt:
+            speech.cancelSpeech()
+            self.pacer.cancel()
+
+        if self.pacer.lookahead or self.pacer.busy or len(text) > settings.chunk_size:
+            # chunks are split as they are handed to speech, so the first one is spoken right away,
+            # and text still being split for an earlier update is spoken first.
+            self.pacer.add(self.iter_chunks(text, settings.chunk_size))
+            self.output.show(text)
+        else:
+            self.output.message(text)
+        stats.count("spoken")
+        stats.end("messageText", start)
+
+    def drain(self):
+        if self.paused:
+            # queued by the reader just as it was paused
+            self.pending.clear()
+            return
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            self.message_text(*item)
+
+    def schedule(self, func, *args):
+        queueHandler.queueFunction(queueHandler.eventQueue, func, *args)
+
+    def update_recorder(self):
+        if self.record_trace and not self.recorder:
+            # imported here as it's only needed when recording
+            from .trace import TraceRecorder, default_trace_path  # noqa: PLC0415
+
+            self.recorder = TraceRecorder(default_trace_path(), self.record_trace_text)
+        elif not self.record_trace and self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def update_history_log(self):
+        if self.write_history_log and not self.history_log:
+            # imported here as it's only needed when the history log is enabled
+            from .historylog import HistoryLog, default_log_directory  # noqa: PLC0415
+
+            self.history_log = HistoryLog(
+                default_log_directory(), self.history_log_max_file_size, self.history_log_max_files
+            )
+            self.history_log.start()
+        elif not self.write_history_log and self.history_log:
+            self.history_log.stop()
+            self.history_log = None
+        elif self.history_log:
+            self.history_log.max_file_size = self.history_log_max_file_size
+            self.history_log.max_files = self.history_log_max_files
+
+    def start(self, threaded=True):
+        # when not threaded, the clipboard is read right away on the thread notifying about the update
+        if threaded:
+            self.reader = ClipboardReader(self.read, settle_delay=self.coalesce_delay)
+            self.reader.start()
+        self.state = True
+        self.update_recorder()
+        self.update_history_log()
+        self.backend.start(self.notify)
+        if speechCanceled:
+            speechCanceled.register(self.pacer.cancel)
+
+    def stop(self):
+        if speechCanceled:
+            speechCanceled.unregister(self.pacer.cancel)
+        self.pacer.cancel()
+        self.output.cancel()
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
+        self.backend.stop()
+        self.pending.clear()
+        self.state = False
+        self.paused = False
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.history_log:
+            self.history_log.stop()
+            self.history_log = None
+
+    def skip_current_clipboard(self):
+        # for text Autoclip put on the clipboard itself, the notification about it is then skipped as unchanged
+        self.last_sequence = self.backend.sequence_number()
+
+    def pause(self):
+        # Only a flag is set, so pausing and resuming are cheap and the listener window is kept.
+        # Text waiting to be spoken is dropped, like when stopping.
+        self.paused = True
+        self.pacer.cancel()
+        self.output.cancel()
+        self.pending.clear()
+
+    def resume(self):
+        # the clipboard as it is now was not read while paused, it's only read on its next change.
+        self.last_sequence = self.backend.sequence_number()
+        self.update_rate.reset()
+        self.paused = False
+
+    def adaptive_delay(self, now):
+        return self.update_rate.delay(now, self.adaptive_min_delay, self.adaptive_max_delay)
+
+    def coalesce_delay(self):
+        if not self.adaptive:
+            return 0
+        return self.adaptive_delay(self.clock())
+
+    def notify(self):
+        # called by the backend when the clipboard changes, the actual read happens on the reader thread.
+        if self.paused:
+            return
+        stats.count("notifications")
+        if self.adaptive:
+            self.update_rate.update(self.clock())
+        if self.recorder:
+            self.recorder.notified(self.clock())
+        sequence = self.backend.sequence_number()
+        if self.reader:
+            self.reader.post(sequence)
+        else:
+            self.read(sequence)
+
+    def read(self, sequence):
+        if self.paused:
+            # posted or retried before pausing
+            return UPDATE_SKIPPED
+        outcome = self._read(sequence)
+        stats.count(outcome)
+        return outcome
+
+    def _read(self, sequence):
+        backend = self.backend
+        recorder = self.recorder
+        # the sequence number is 0 when it can't be retrieved, in which case always read.
+        if sequence and sequence == self.last_sequence:
+            if recorder:
+                recorder.unchanged()
+            return UPDATE_SKIPPED
+        if not backend.is_text_available():
+            self.last_sequence = sequence
+            if recorder:
+                recorder.read(None)
+            return UPDATE_SKIPPED
+        settings = self.settings
+        if self.app_settings:
+            settings = self.app_settings.get(backend.owner_app(), settings)
+        start = stats.begin()
+        snapshot = backend.read_snapshot(settings.max_length, self.line_mode)
+        stats.end("read", start)
+        if snapshot.error == SNAPSHOT_OPEN_FAILED:
+            self.retry_read(sequence)
+            return UPDATE_RETRY
+        if self._retry_delays is not None:
+            log.debug("Opened the clipboard after %d retries", self._retry_attempts)
+            self._retry_delays = None
+        # the sequence number read with the text, the clipboard may have changed again since the notification
+        self.last_sequence = snapshot.sequence or sequence
+        data = snapshot.text
+        if recorder:
+            recorder.read(data)
+        start = stats.begin()
+        outcome = self.handle_text(data, settings)
+        stats.end("handleText", start)
+        return outcome
+
+    def retry_read(self, sequence):
+        # Instead of blocking the reader, the read is rescheduled following the retry policy,
+        # and a single warning is logged if the clipboard could not be opened at all.
+        stats.count("openRetries")
+        if self._retry_delays is None:
+            self._retry_delays = self.retry_policy.delays()
+            self._retry_attempts = 0
+            self._retry_started = time.monotonic()
+        self._retry_attempts += 1
+        delay = next(self._retry_delays, None)
+        if delay is None:
+            stats.count("openFailures")
+            log.warning(
+                "Could not open the clipboard after %d attempts in %d ms, it's probably held open by another program",
+                self._retry_attempts,
+                (time.monotonic() - self._retry_started) * 1000,
+            )
+            self._retry_delays = None
+            return
+        if self.reader:
+            self.reader.retry(sequence, delay)
+        else:
+            timer = threading.Timer(delay, self.read, (sequence,))
+            timer.daemon = True
+            timer.start()
+
+    def delays(self, settings, now):
+        # the interrupt and debounce delays for an update at now
+        interrupt_delay = settings.interrupt_delay
+        debounce_delay = settings.debounce_delay
+        if self.adaptive:
+            # bursts space interrupts and filter repeats further apart, when idle the configured values apply.
+            delay = self.adaptive_delay(now)
+            interrupt_delay = max(delay, interrupt_delay)
+            if debounce_delay > 0:
+                debounce_delay = max(delay, debounce_delay)
+        return interrupt_delay, debounce_delay
+
+    def new_part(self, data, key):
+        # When speaking new lines or changes only, the part of data that was not spoken yet,
+        # which is empty if there is nothing new. Its key is None, as it's not the whole clipboard text.
+        if self.line_mode:
+            return self.lines.new_lines(data), None
+        if self.changes_only:
+            previous, self.last_text = self.last_text, data
+            data = changed_text(previous, data)
+            return ("" if data.isspace() else data), None
+        return data, key
+
+    def handle_text(self, data, settings=None):
+        if settings is None:
+            settings = self.settings
+        if not data or data.isspace():
+            return UPDATE_IGNORED
+        if self.line_mode:
+            if len(data) > settings.max_length:
+                # only the end of a longer text was read, its first line is likely cut
+                data = data.partition("\n")[2]
+        elif len(data) >= settings.max_length:
+            return UPDATE_IGNORED
+        if self.rules:
+            data = self.rules.apply(data)
+            if not data or data.isspace():
+                return UPDATE_IGNORED
+        current_time = self.clock()
+        elapsed = current_time - self.last_time
+        interrupt_delay, debounce_delay = self.delays(settings, current_time)
+        self.recent.ttl = debounce_delay
+
+        key = text_key(data)
+        if self.recent.seen(key, current_time):
+            self.last_time = current_time
+            return UPDATE_DUPLICATE
+
+        data, key = self.new_part(data, key)
+        if not data:
+            self.last_time = current_time
+            return UPDATE_UNCHANGED
+
+        should_interrupt = settings.interrupt and elapsed > interrupt_delay
+
+        self.history.add(data, key)
+        history_log = self.history_log
+        if history_log:
+            history_log.add(data)
+        self.generation += 1
+        if self.pending.put((data, should_interrupt, self.generation, settings)):
+            self.schedule(self.drain)
+        self.last_time = current_time
+        return UPDATE_QUEUED
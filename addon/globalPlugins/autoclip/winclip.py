@@ -10,8 +10,8 @@
 import contextlib
 import ctypes
 import functools
+import os
 import sys
-import time
 from ctypes.wintypes import (
     ATOM,
     BOOL,
@@ -27,19 +27,28 @@ from ctypes.wintypes import (
     INT,
     LPARAM,
     LPCWSTR,
+    LPDWORD,
     LPVOID,
+    LPWSTR,
     UINT,
     WPARAM,
 )
 
 from logHandler import log
 
+from .backends import SNAPSHOT_OPEN_FAILED, SNAPSHOT_READ_FAILED, ClipboardSnapshot
+from .stats import stats
+
 HCURSOR = HANDLE
 LRESULT = ctypes.c_longlong if sys.maxsize > 2**32 else ctypes.c_long
 CF_UNICODETEXT = 13
+HTML_FORMAT_NAME = "HTML Format"
+RTF_FORMAT_NAME = "Rich Text Format"
 WM_CLIPBOARDUPDATE = 0x031D
 GWL_WNDPROC = -4
 HWND_MESSAGE = -3
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+MAX_PATH_LENGTH = 32768
 
 
 WNDPROC = ctypes.WINFUNCTYPE(LRESULT, HWND, UINT, WPARAM, LPARAM)
@@ -62,127 +71,217 @@ class WNDCLASSEX(ctypes.Structure):
     )
 
 
-class error_check:
-    def __init__(self, func):
-        super().__setattr__("func", func)
-        functools.update_wrapper(self, func)
-
-    def __call__(self, *args, **kwargs):
-        result = self.func(*args, **kwargs)
-        if not result:
-            error_code = ctypes.GetLastError()
-            if error_code != 0:
-                error_message = f"Error in {self.func.__name__}"
-                exc = ctypes.WinError(error_code)
-                log.error(error_message, exc_info=exc)
-        return result
-
-    def __setattr__(self, name, value):
-        if name in ("argtypes", "restype"):
-            setattr(self.func, name, value)
-        else:
-            super().__setattr__(name, value)
-
-    def __getattr__(self, name):
-        if name in ("argtypes", "restype"):
-            return getattr(self.func, name)
-        raise AttributeError("name")
+def check_result(result, func, args):
+    # errcheck of the bindings where a zero result is an error, logs the error and returns the result as is.
+    if not result:
+        error_code = ctypes.GetLastError()
+        if error_code != 0:
+            log.error("Error in %s", func.__name__, exc_info=ctypes.WinError(error_code))
+    return result
+
+
+def bind(dll, name, argtypes, restype, checked=True):
+    # Unchecked bindings are those where failing is expected, or where the caller checks the result itself.
+    func = dll[name]
+    func.argtypes = argtypes
+    func.restype = restype
+    if checked:
+        func.errcheck = check_result
+    return func
+
+
+user32 = ctypes.windll.user32
+kernel32 = ctypes.windll.kernel32
+
+OpenClipboard = bind(user32, "OpenClipboard", [HWND], BOOL, checked=False)
+CloseClipboard = bind(user32, "CloseClipboard", [], BOOL)
+GetClipboardData = bind(user32, "GetClipboardData", [UINT], HANDLE, checked=False)
+GetClipboardSequenceNumber = bind(user32, "GetClipboardSequenceNumber", [], DWORD, checked=False)
+IsClipboardFormatAvailable = bind(user32, "IsClipboardFormatAvailable", [UINT], BOOL, checked=False)
+RegisterClipboardFormat = bind(user32, "RegisterClipboardFormatW", [LPCWSTR], UINT)
+AddClipboardFormatListener = bind(user32, "AddClipboardFormatListener", [HWND], BOOL)
+RemoveClipboardFormatListener = bind(user32, "RemoveClipboardFormatListener", [HWND], BOOL)
+GetClipboardOwner = bind(user32, "GetClipboardOwner", [], HWND, checked=False)
+GetWindowThreadProcessId = bind(
+    user32, "GetWindowThreadProcessId", [HWND, LPDWORD], DWORD, checked=False
+)
+OpenProcess = bind(kernel32, "OpenProcess", [DWORD, BOOL, DWORD], HANDLE, checked=False)
+QueryFullProcessImageName = bind(
+    kernel32, "QueryFullProcessImageNameW", [HANDLE, DWORD, LPWSTR, LPDWORD], BOOL, checked=False
+)
+CloseHandle = bind(kernel32, "CloseHandle", [HANDLE], BOOL)
+GlobalLock = bind(kernel32, "GlobalLock", [HGLOBAL], LPVOID, checked=False)
+GlobalSize = bind(kernel32, "GlobalSize", [HGLOBAL], ctypes.c_size_t, checked=False)
+GlobalUnlock = bind(kernel32, "GlobalUnlock", [HGLOBAL], BOOL, checked=False)
+lstrlenW = bind(kernel32, "lstrlenW", [LPVOID], INT, checked=False)
+GetModuleHandle = bind(kernel32, "GetModuleHandleW", [LPCWSTR], HMODULE)
+RegisterClassEx = bind(user32, "RegisterClassExW", [ctypes.POINTER(WNDCLASSEX)], ATOM)
+UnregisterClass = bind(user32, "UnregisterClassW", [LPCWSTR, HINSTANCE], BOOL)
+CreateWindowEx = bind(
+    user32,
+    "CreateWindowExW",
+    [DWORD, LPCWSTR, LPCWSTR, DWORD, INT, INT, INT, INT, HWND, HMENU, HINSTANCE, LPVOID],
+    HWND,
+)
+DestroyWindow = bind(user32, "DestroyWindow", [HWND], BOOL)
+DefWindowProc = bind(
+    user32, "DefWindowProcW", [HWND, UINT, WPARAM, LPARAM], ctypes.c_long, checked=False
+)
 
 
-OpenClipboard = ctypes.windll.user32["OpenClipboard"]
-OpenClipboard.argtypes = [HWND]
-OpenClipboard.restype = BOOL
+@contextlib.contextmanager
+def clipboard(hwnd):
+    # Makes a single attempt to open the clipboard and yields whether it was opened,
+    # it's only closed if it was. Another program could be holding it open, retrying is left to the caller.
+    start = stats.begin()
+    opened = bool(OpenClipboard(hwnd))
+    stats.end("openClipboard", start)
+    try:
+        yield opened
+    finally:
+        if opened:
+            CloseClipboard()
 
-CloseClipboard = error_check(ctypes.windll.user32["CloseClipboard"])
-CloseClipboard.argtypes = []
-CloseClipboard.restype = BOOL
 
-GetClipboardData = error_check(ctypes.windll.user32["GetClipboardData"])
-GetClipboardData.argtypes = [UINT]
-GetClipboardData.restype = HANDLE
+@functools.lru_cache(maxsize=None)
+def registered_format(name):
+    # registering an already registered format returns its existing identifier, 0 on failure
+    return RegisterClipboardFormat(name)
 
-AddClipboardFormatListener = error_check(ctypes.windll.user32["AddClipboardFormatListener"])
-AddClipboardFormatListener.argtypes = [HWND]
-AddClipboardFormatListener.restype = BOOL
 
-RemoveClipboardFormatListener = error_check(ctypes.windll.user32["RemoveClipboardFormatListener"])
-RemoveClipboardFormatListener.argtypes = [HWND]
-RemoveClipboardFormatListener.restype = BOOL
+def is_format_available(data_format=CF_UNICODETEXT):
+    # does not require the clipboard to be opened
+    return bool(IsClipboardFormatAvailable(data_format))
 
-GlobalLock = error_check(ctypes.windll.kernel32["GlobalLock"])
-GlobalLock.argtypes = [HGLOBAL]
-GlobalLock.restype = LPVOID
 
-GlobalUnlock = error_check(ctypes.windll.kernel32["GlobalUnlock"])
-GlobalUnlock.argtypes = [HGLOBAL]
-GlobalUnlock.restype = BOOL
+def get_clipboard_data(data_format=CF_UNICODETEXT, max_length=None, tail=False):
+    # When max_length is given, at most max_length + 1 characters are copied out of the clipboard,
+    # text longer than max_length is rejected and an empty string is returned,
+    # unless tail is set, in which case its last max_length + 1 characters are returned.
+    start = stats.begin()
+    try:
+        data = _get_clipboard_data(data_format, max_length, tail)
+        return "" if data is None else data
+    finally:
+        stats.end("getClipboardData", start)
 
-GetModuleHandle = error_check(ctypes.windll.kernel32["GetModuleHandleW"])
-GetModuleHandle.argtypes = [LPCWSTR]
-GetModuleHandle.restype = HMODULE
 
-RegisterClassEx = error_check(ctypes.windll.user32["RegisterClassExW"])
-RegisterClassEx.argtypes = [ctypes.POINTER(WNDCLASSEX)]
-RegisterClassEx.restype = ATOM
+def _get_clipboard_data(data_format, max_length, tail=False):
+    # None if the data could not be retrieved
+    if tail and max_length is not None:
+        return _get_clipboard_tail(data_format, max_length)
+    return _get_clipboard_head(data_format, max_length)
 
-UnregisterClass = error_check(ctypes.windll.user32["UnregisterClassW"])
-UnregisterClass.argtypes = [LPCWSTR, HINSTANCE]
-UnregisterClass.restype = BOOL
 
-CreateWindowEx = error_check(ctypes.windll.user32["CreateWindowExW"])
-CreateWindowEx.argtypes = [
-    DWORD,
-    LPCWSTR,
-    LPCWSTR,
-    DWORD,
-    INT,
-    INT,
-    INT,
-    INT,
-    HWND,
-    HMENU,
-    HINSTANCE,
-    LPVOID,
-]
-CreateWindowEx.restype = HWND
+def _get_clipboard_head(data_format, max_length):
+    handle = GetClipboardData(data_format)
+    if not handle:
+        log.warning("Could not get clipboard data", exc_info=ctypes.WinError())
+        return None
+    size = GlobalSize(handle) // ctypes.sizeof(ctypes.c_wchar)
+    if not size:
+        return ""
+    if max_length is not None and size > max_length + 1:
+        size = max_length + 1
+    locked_handle = GlobalLock(handle)
+    if not locked_handle:
+        log.warning("Could not lock clipboard data", exc_info=ctypes.WinError())
+        return None
+    try:
+        data = ctypes.wstring_at(locked_handle, size)
+    finally:
+        GlobalUnlock(handle)
+    end = data.find("\0")
+    if end == -1 and max_length is not None and size > max_length:
+        log.debug("Clipboard text is longer than %d characters, ignoring", max_length)
+        return ""
+    return data if end == -1 else data[:end]
 
-DestroyWindow = error_check(ctypes.windll.user32["DestroyWindow"])
-DestroyWindow.argtypes = [HWND]
-DestroyWindow.restype = BOOL
 
-DefWindowProc = ctypes.windll.user32["DefWindowProcW"]
-DefWindowProc.argtypes = [HWND, UINT, WPARAM, LPARAM]
-DefWindowProc.restype = ctypes.c_long
+def _get_clipboard_tail(data_format, max_length):
+    handle = GetClipboardData(data_format)
+    if not handle:
+        log.warning("Could not get clipboard data", exc_info=ctypes.WinError())
+        return None
+    size = GlobalSize(handle) // ctypes.sizeof(ctypes.c_wchar)
+    if not size:
+        return ""
+    locked_handle = GlobalLock(handle)
+    if not locked_handle:
+        log.warning("Could not lock clipboard data", exc_info=ctypes.WinError())
+        return None
+    try:
+        # the memory can be larger than the text, lstrlenW finds where it ends without copying it.
+        length = min(lstrlenW(locked_handle), size)
+        start = max(0, length - max_length - 1)
+        address = locked_handle + start * ctypes.sizeof(ctypes.c_wchar)
+        return ctypes.wstring_at(address, length - start)
+    finally:
+        GlobalUnlock(handle)
 
 
-@contextlib.contextmanager
-def clipboard(hwnd):
-    # a program could be opening the clipboard, so we'll try for at least a quarter of a second to open it
-    t = time.monotonic() + 0.25
-    while time.monotonic() < t:
-        s = OpenClipboard(hwnd)
-        if s:
-            break
-        if not s:
-            log.warning("Error while trying to open clipboard.", exc_info=ctypes.WinError())
-            time.sleep(0.01)
+def read_text_snapshot(hwnd, max_length=None, tail=False):
+    # Opens the clipboard, copies its text out and closes it again right away, in one call.
+    # The sequence number is taken while the clipboard is open, so it's the one of the text that was read.
+    start = stats.begin()
+    opened = OpenClipboard(hwnd)
+    stats.end("openClipboard", start)
+    if not opened:
+        stats.end("readTextSnapshot", start)
+        return ClipboardSnapshot("", 0, SNAPSHOT_OPEN_FAILED)
     try:
-        yield
+        sequence = GetClipboardSequenceNumber()
+        data_start = stats.begin()
+        text = _get_clipboard_data(CF_UNICODETEXT, max_length, tail)
+        stats.end("getClipboardData", data_start)
     finally:
         CloseClipboard()
+        stats.end("readTextSnapshot", start)
+    if text is None:
+        return ClipboardSnapshot("", sequence, SNAPSHOT_READ_FAILED)
+    return ClipboardSnapshot(text, sequence, None)
 
 
-def get_clipboard_data(data_format=CF_UNICODETEXT):
+def get_clipboard_bytes(data_format, max_size=None):
+    # returns None if there is more data than max_size bytes, without copying it.
     handle = GetClipboardData(data_format)
     if not handle:
         log.warning("Could not get clipboard data", exc_info=ctypes.WinError())
-        return ""
+        return b""
+    size = GlobalSize(handle)
+    if max_size is not None and size > max_size:
+        log.debug("Clipboard data is larger than %d bytes, ignoring", max_size)
+        return None
     locked_handle = GlobalLock(handle)
+    if not locked_handle:
+        return b""
     try:
-        data = ctypes.wstring_at(locked_handle)
-        return data if data else ""
+        data = ctypes.string_at(locked_handle, size)
     finally:
         GlobalUnlock(handle)
+    end = data.find(b"\0")
+    return data if end == -1 else data[:end]
+
+
+def get_window_process_id(hwnd):
+    process_id = DWORD()
+    GetWindowThreadProcessId(hwnd, ctypes.byref(process_id))
+    return process_id.value
+
+
+def get_process_name(process_id):
+    # the executable name without extension in lowercase, like NVDA app module names, empty if unknown
+    process = OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, process_id)
+    if not process:
+        return ""
+    try:
+        buffer = ctypes.create_unicode_buffer(MAX_PATH_LENGTH)
+        size = DWORD(MAX_PATH_LENGTH)
+        if not QueryFullProcessImageName(process, 0, buffer, ctypes.byref(size)):
+            return ""
+    finally:
+        CloseHandle(process)
+    return os.path.splitext(os.path.basename(buffer.value))[0].lower()
 
 
 class ClipboardMessageWindow:
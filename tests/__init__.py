@@ -0,0 +1,26 @@
+# tests
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# Run from the repository root with python -m unittest discover -s tests -t . or python -m pytest tests.
+# The NVDA modules are stubbed before the add-on is imported, see nvda_stubs.
+
+import os
+import sys
+
+from . import nvda_stubs
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon", "globalPlugins"
+    ),
+)
+nvda_stubs.install()
+
+# registers the configuration spec the stubs take defaults from
+import autoclip  # noqa: E402, F401
@@ -0,0 +1,55 @@
+# benchmark
+# helpers of the opt-in benchmarks, which are skipped unless AUTOCLIP_BENCHMARK is set:
+# AUTOCLIP_BENCHMARK=1 python -m unittest discover -s tests -t . -k Benchmark
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import os
+import sys
+import timeit
+import tracemalloc
+import unittest
+
+ENABLED = bool(os.environ.get("AUTOCLIP_BENCHMARK"))
+
+# timings vary between machines, they are skipped in a normal test run
+benchmark = unittest.skipUnless(ENABLED, "set AUTOCLIP_BENCHMARK=1 to run benchmarks")
+
+
+def best_time(func, repeat=5, number=1):
+    # seconds per call, from the fastest of repeat rounds of number calls
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def peak_memory(func):
+    # bytes allocated at the peak while calling func
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def ms(seconds):
+    return f"{seconds * 1000:.3f} ms"
+
+
+def us(seconds):
+    return f"{seconds * 1_000_000:.2f} us"
+
+
+def kb(size):
+    return f"{size / 1024:.1f} KB"
+
+
+def report(name, **values):
+    # written to stderr, next to the test results
+    print(
+        f"\n{name}: " + ", ".join(f"{key} {value}" for key, value in values.items()),
+        file=sys.stderr,
+    )
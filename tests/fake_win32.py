@@ -0,0 +1,112 @@
+# fake_win32
+# a fake user32 and kernel32 with an in memory clipboard, to load winclip where ctypes.windll doesn't exist.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import ctypes
+import importlib
+import sys
+import types
+from ctypes.wintypes import BOOL, DWORD, HANDLE, HGLOBAL, HWND, INT, LPVOID, UINT
+from unittest import mock
+
+CF_UNICODETEXT = 13
+# restype and argtypes of the functions FakeClipboard implements, the same as the real ones,
+# so they are called through ctypes like the functions of a DLL
+SIGNATURES = {
+    "OpenClipboard": (BOOL, HWND),
+    "CloseClipboard": (BOOL,),
+    "GetClipboardData": (HANDLE, UINT),
+    "GetClipboardSequenceNumber": (DWORD,),
+    "IsClipboardFormatAvailable": (BOOL, UINT),
+    "GlobalLock": (LPVOID, HGLOBAL),
+    "GlobalSize": (ctypes.c_size_t, HGLOBAL),
+    "GlobalUnlock": (BOOL, HGLOBAL),
+    "lstrlenW": (INT, LPVOID),
+}
+_wcslen = ctypes.CDLL(None).wcslen
+_wcslen.argtypes = [LPVOID]
+_wcslen.restype = ctypes.c_size_t
+
+
+class FakeClipboard:
+    # The clipboard and the global memory the fake functions work on, memory handles are keys of memory.
+    def __init__(self):
+        self.memory = {}  # handle: ctypes buffer
+        self.formats = {}  # clipboard format: handle
+        self.sequence = 0
+        self.is_open = False
+        self.locks = 0
+
+    def set_text(self, text, size=None):
+        # size is the number of characters allocated, the memory can be larger than the text
+        buffer = ctypes.create_unicode_buffer(text, len(text) + 1 if size is None else size)
+        handle = len(self.memory) + 1
+        self.memory = {handle: buffer}
+        self.formats = {CF_UNICODETEXT: handle}
+        self.sequence += 1
+
+    def OpenClipboard(self, hwnd):
+        if self.is_open:
+            return 0
+        self.is_open = True
+        return 1
+
+    def CloseClipboard(self):
+        self.is_open = False
+        return 1
+
+    def GetClipboardData(self, data_format):
+        return self.formats.get(data_format, 0) if self.is_open else 0
+
+    def GetClipboardSequenceNumber(self):
+        return self.sequence
+
+    def IsClipboardFormatAvailable(self, data_format):
+        return data_format in self.formats
+
+    def GlobalLock(self, handle):
+        self.locks += 1
+        return ctypes.addressof(self.memory[handle])
+
+    def GlobalSize(self, handle):
+        return ctypes.sizeof(self.memory[handle])
+
+    def GlobalUnlock(self, handle):
+        self.locks -= 1
+        return 1
+
+    def lstrlenW(self, address):
+        return _wcslen(address)
+
+
+class FakeDll:
+    # Looked up like ctypes.windll.user32[name]. Functions FakeClipboard doesn't implement return 0.
+    def __init__(self, clipboard):
+        self.clipboard = clipboard
+
+    def __getitem__(self, name):
+        signature = SIGNATURES.get(name)
+        if signature is None:
+            return ctypes.CFUNCTYPE(ctypes.c_void_p)(lambda: 0)
+        return ctypes.CFUNCTYPE(*signature)(getattr(self.clipboard, name))
+
+
+def load_winclip(clipboard):
+    # imports a new winclip bound to a fake dll working on clipboard, without keeping it imported
+    import autoclip  # noqa: PLC0415
+
+    dll = FakeDll(clipboard)
+    windll = types.SimpleNamespace(user32=dll, kernel32=dll)
+    patched = mock.patch.multiple(ctypes, windll=windll, WINFUNCTYPE=ctypes.CFUNCTYPE, create=True)
+    with patched, mock.patch.dict(sys.modules):
+        sys.modules.pop("autoclip.winclip", None)
+        try:
+            return importlib.import_module("autoclip.winclip")
+        finally:
+            # so Win32Backend doesn't pick it up with from . import winclip
+            autoclip.__dict__.pop("winclip", None)
@@ -0,0 +1,35 @@
+# helpers
+# a clipboard watcher on a memory backend and simulated clock, shared by the tests.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import unittest
+
+from autoclip.backends import MemoryBackend, SimulatedClock
+from autoclip.watcher import ClipboardWatcher
+
+from . import nvda_stubs
+
+
+class WatcherTestCase(unittest.TestCase):
+    def make_watcher(self, start=True, threaded=False, **overrides):
+        # The configuration is reset to its defaults with overrides applied before the watcher loads it.
+        # Not threaded, the clipboard is read as soon as it's set, and the text is spoken on pump.
+        nvda_stubs.reset(**overrides)
+        self.clock = SimulatedClock()
+        self.backend = MemoryBackend()
+        self.watcher = ClipboardWatcher(self.backend, self.clock)
+        self.addCleanup(self.watcher.stop)
+        if start:
+            self.watcher.start(threaded=threaded)
+        return self.watcher
+
+    def set_texts(self, *texts, interval=1):
+        # each text is put on the clipboard interval simulated seconds after the previous one
+        for text in texts:
+            self.clock.advance(interval)
+            self.backend.set_text(text)
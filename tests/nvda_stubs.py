@@ -0,0 +1,164 @@
+# nvda_stubs
+# stand-ins for the NVDA modules the add-on imports, so its clipboard pipeline can be tested without NVDA.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+# Only what the add-on uses is stubbed. Speech, braille and queued functions are recorded,
+# so tests can check what would have been spoken, and run queued functions with pump.
+
+import builtins
+import logging
+import re
+import sys
+import types
+
+spoken = []  # speech sequences passed to speech.speak
+braille_messages = []
+queued = []  # (function, args) queued with queueHandler.queueFunction
+delayed = []  # (milliseconds, function, args) passed to core.callLater
+
+_DEFAULT_RE = re.compile(r"default=(list\(\)|[^,)]*)")
+
+
+class _ExtensionPoint:
+    def register(self, handler):
+        pass
+
+    def unregister(self, handler):
+        pass
+
+
+class _BrailleHandler:
+    def message(self, text):
+        braille_messages.append(text)
+
+
+class _CallbackCommand:
+    def __init__(self, callback, name=None):
+        self.callback = callback
+        self.name = name
+
+
+class _EndUtteranceCommand:
+    def __eq__(self, other):
+        return isinstance(other, _EndUtteranceCommand)
+
+    __hash__ = None
+
+
+class _SettingsPanel:
+    pass
+
+
+class _Config(dict):
+    # config.conf, with the spec the add-on registers its configuration in
+    def __init__(self):
+        super().__init__()
+        self.spec = {}
+
+
+_conf = _Config()
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def _speak(sequence, *args, **kwargs):
+    spoken.append(list(sequence))
+
+
+def _queue_function(queue, func, *args, **kwargs):
+    queued.append((func, args))
+
+
+def _call_later(delay, func, *args):
+    delayed.append((delay, func, args))
+
+
+def _script(**kwargs):
+    return lambda func: func
+
+
+def install():
+    log = logging.getLogger("nvda")
+    log.debugWarning = log.debug
+    builtins._ = lambda text: text
+    _module("logHandler", log=log)
+    _module("addonHandler", initTranslation=lambda: None)
+    _module("api", copyToClip=lambda text: True)
+    _module("config", conf=_conf, post_configProfileSwitch=_ExtensionPoint())
+    _module("core", callLater=_call_later, postNvdaStartup=_ExtensionPoint())
+    _module("globalPluginHandler", GlobalPlugin=object, runningPlugins=[])
+    _module("globalVars", appArgs=types.SimpleNamespace(secure=False, configPath=""))
+    _module("queueHandler", eventQueue="eventQueue", queueFunction=_queue_function)
+    _module("scriptHandler", script=_script, getLastScriptRepeatCount=lambda: 0)
+    _module("ui", message=lambda text, *args, **kwargs: None, browseableMessage=None)
+    _module("braille", handler=_BrailleHandler())
+    _module("wx")
+    gui = _module("gui", mainFrame=None)
+    gui.guiHelper = _module("gui.guiHelper")
+    gui.settingsDialogs = _module(
+        "gui.settingsDialogs",
+        SettingsPanel=_SettingsPanel,
+        NVDASettingsDialog=types.SimpleNamespace(categoryClasses=[]),
+    )
+    speech = _module("speech", speak=_speak, cancelSpeech=lambda: None)
+    speech.commands = _module(
+        "speech.commands",
+        CallbackCommand=_CallbackCommand,
+        EndUtteranceCommand=_EndUtteranceCommand,
+    )
+    speech.extensions = _module("speech.extensions", speechCanceled=_ExtensionPoint())
+
+
+def _default(spec):
+    if isinstance(spec, dict):
+        return {}
+    value = _DEFAULT_RE.search(spec).group(1)
+    if value == "list()":
+        return []
+    if value in ("true", "false"):
+        return value == "true"
+    if value == "None":
+        return None
+    return int(value)
+
+
+def default_config():
+    # the Autoclip configuration with every key at its default, from the spec the add-on registered
+    return {key: _default(spec) for key, spec in _conf.spec["autoclip"].items()}
+
+
+def reset(**overrides):
+    # restores the default configuration with overrides applied, and forgets what was recorded
+    conf = default_config()
+    conf.update(overrides)
+    _conf["autoclip"] = conf
+    spoken.clear()
+    braille_messages.clear()
+    queued.clear()
+    delayed.clear()
+    return conf
+
+
+def run_delayed():
+    # runs the functions passed to core.callLater so far, as if their delays were over
+    calls = delayed[:]
+    delayed.clear()
+    for _delay, func, args in calls:
+        func(*args)
+
+
+def pump():
+    # runs queued functions, including those queued while running them
+    while queued:
+        func, args = queued.pop(0)
+        func(*args)
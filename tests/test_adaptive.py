@@ -0,0 +1,91 @@
+# test_adaptive
+# estimating the clipboard update rate to adapt delays.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import unittest
+
+from autoclip.adaptive import COALESCE_FACTOR, UpdateRateEstimator
+from autoclip.backends import SimulatedClock
+
+from . import nvda_stubs  # noqa: F401
+from .helpers import WatcherTestCase
+
+MIN_DELAY = 0.01
+MAX_DELAY = 0.2
+
+
+class UpdateRateEstimatorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = SimulatedClock()
+        self.estimator = UpdateRateEstimator()
+
+    def updates(self, count, interval):
+        for _update in range(count):
+            self.clock.advance(interval)
+            self.estimator.update(self.clock())
+
+    def delay(self):
+        return self.estimator.delay(self.clock(), MIN_DELAY, MAX_DELAY)
+
+    def test_first_update_is_not_delayed(self):
+        self.assertEqual(self.delay(), MIN_DELAY)
+        self.updates(1, 0.05)
+        self.assertIsNone(self.estimator.interval)
+        self.assertEqual(self.delay(), MIN_DELAY)
+
+    def test_burst_is_coalesced(self):
+        self.updates(20, 0.05)
+        self.assertAlmostEqual(self.estimator.interval, 0.05)
+        self.assertAlmostEqual(self.delay(), 0.05 * COALESCE_FACTOR)
+        # faster updates pull the average down gradually
+        self.updates(1, 0.02)
+        self.assertAlmostEqual(self.estimator.interval, 0.05 + 0.3 * (0.02 - 0.05))
+
+    def test_delay_stays_within_bounds(self):
+        self.updates(20, 0.001)
+        self.assertEqual(self.delay(), MIN_DELAY)
+        self.updates(20, 0.15)
+        self.assertEqual(self.delay(), MAX_DELAY)
+
+    def test_slow_updates_and_pauses_are_not_delayed(self):
+        self.updates(20, 0.5)
+        self.assertEqual(self.delay(), MIN_DELAY)
+        self.updates(20, 0.05)
+        self.clock.advance(MAX_DELAY * 2)
+        self.assertEqual(self.delay(), MIN_DELAY)
+
+    def test_long_idle_counts_as_max_interval(self):
+        self.updates(20, 0.05)
+        self.updates(1, 3600)
+        self.assertEqual(self.estimator.last_sample, self.estimator.max_interval)
+        # the next burst is picked up after a few updates instead of thousands
+        self.updates(10, 0.05)
+        self.assertLess(self.estimator.interval, 0.1)
+
+    def test_reset(self):
+        self.updates(20, 0.05)
+        self.estimator.reset()
+        self.assertIsNone(self.estimator.interval)
+        self.assertEqual(self.delay(), MIN_DELAY)
+
+
+class AdaptiveWatcherTest(WatcherTestCase):
+    def test_burst_raises_the_coalescing_delay(self):
+        self.make_watcher(adaptiveTiming=True, adaptiveMinDelay=10, adaptiveMaxDelay=200)
+        self.assertEqual(self.watcher.coalesce_delay(), MIN_DELAY)
+        self.set_texts(*(f"text {index}" for index in range(20)), interval=0.05)
+        self.assertAlmostEqual(self.watcher.coalesce_delay(), 0.05 * COALESCE_FACTOR)
+        # a pause resets the estimate
+        self.watcher.pause()
+        self.watcher.resume()
+        self.assertEqual(self.watcher.coalesce_delay(), MIN_DELAY)
+
+    def test_disabled(self):
+        self.make_watcher(adaptiveTiming=False)
+        self.set_texts(*(f"text {index}" for index in range(20)), interval=0.05)
+        self.assertEqual(self.watcher.coalesce_delay(), 0)
@@ -0,0 +1,36 @@
+# test_backends
+# the clipboard backend interface and the in memory backend.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import unittest
+
+from autoclip.backends import SNAPSHOT_OPEN_FAILED, ClipboardBackend, MemoryBackend
+
+from . import nvda_stubs  # noqa: F401
+
+
+class ClipboardBackendTest(unittest.TestCase):
+    def test_incomplete_backend_fails_when_created(self):
+        class NoReadBackend(ClipboardBackend):
+            def start(self, on_update):
+                pass
+
+            def stop(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoReadBackend()
+
+    def test_memory_backend_snapshot(self):
+        backend = MemoryBackend()
+        backend.set_text("0123456789")
+        self.assertEqual(backend.read_snapshot(), ("0123456789", 1, None))
+        self.assertEqual(backend.read_snapshot(5).text, "")
+        self.assertEqual(backend.read_snapshot(5, tail=True).text, "456789")
+        backend.failing_opens = 1
+        self.assertEqual(backend.read_snapshot().error, SNAPSHOT_OPEN_FAILED)
@@ -0,0 +1,173 @@
+# test_chunking
+# splitting long clipboard text into chunks spoken separately.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import random
+import unittest
+
+from autoclip.chunking import (
+    iter_hard_bounds,
+    iter_sentence_bounds,
+    iter_word_bounds,
+    min_chunk_size,
+    split_text,
+)
+
+from . import nvda_stubs  # noqa: F401
+from .benchmark import benchmark, best_time, kb, ms, peak_memory, report
+
+
+def old_split_text(text, chunk_size, split_at_word):
+    # the watcher's split_text before it yielded offsets, kept as a reference
+    length = len(text)
+    if not text or length <= chunk_size or not chunk_size or chunk_size < min_chunk_size:
+        return [text]
+
+    chunks = []
+    index = 0
+    while index < length:
+        next_index = min(index + chunk_size, length)
+        chunk = text[index:next_index]
+        if next_index >= length or not split_at_word or chunk.endswith(" "):
+            chunks.append(chunk)
+            index = next_index
+        else:
+            last_space = chunk.rfind(" ")
+            if last_space > 1:
+                chunks.append(chunk[:last_space])
+                index += last_space + 1
+            else:
+                chunks.append(chunk)
+                index = next_index
+    return chunks
+
+
+def random_text(rand, length, max_word=12):
+    words = []
+    total = 0
+    while total < length:
+        word = "x" * rand.randint(1, max_word)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:length]
+
+
+class WordSplitTest(unittest.TestCase):
+    def test_same_chunks_as_before(self):
+        rand = random.Random(4)  # noqa: S311
+        for _case in range(300):
+            text = random_text(rand, rand.randint(0, 2000), max_word=rand.choice((3, 12, 150)))
+            chunk_size = rand.choice((0, 50, 100, 101, 150, 400))
+            for splitter, split_at_word in ((iter_word_bounds, True), (iter_hard_bounds, False)):
+                self.assertEqual(
+                    split_text(text, chunk_size, splitter),
+                    old_split_text(text, chunk_size, split_at_word),
+                )
+
+    def test_chunks_are_not_longer_than_chunk_size(self):
+        text = random_text(random.Random(5), 5000)  # noqa: S311
+        for chunk in split_text(text, 120):
+            self.assertLessEqual(len(chunk), 120)
+
+    def test_offsets_are_yielded_before_the_text_is_split(self):
+        bounds = iter_word_bounds("word " * 100_000, 100)
+        self.assertEqual(next(bounds), (0, 100))
+        self.assertEqual(next(bounds), (100, 200))
+
+
+class SentenceSplitTest(unittest.TestCase):
+    def split(self, text, chunk_size=100):
+        return split_text(text, chunk_size, iter_sentence_bounds)
+
+    def test_ends_chunks_at_sentence_ends(self):
+        chunks = self.split("Hello there, how are you today. " * 10)
+        self.assertEqual(
+            chunks[0], "Hello there, how are you today. " * 2 + "Hello there, how are you today."
+        )
+        for chunk in chunks:
+            self.assertTrue(chunk.rstrip().endswith("."))
+
+    def test_numbers_are_not_sentence_ends(self):
+        chunks = self.split("pi is 3.14159 and e is 2.71828, " * 10)
+        for chunk in chunks[:-1]:
+            self.assertTrue(chunk.endswith(","))
+
+    def test_cjk_punctuation(self):
+        chunks = self.split("数字是三点一四，不是。" * 20)  # noqa: RUF001
+        for chunk in chunks[:-1]:
+            self.assertTrue(chunk.endswith("。"))
+
+    def test_text_without_boundaries_is_cut(self):
+        self.assertEqual(self.split("x" * 250), ["x" * 100, "x" * 100, "x" * 50])
+
+    def test_only_whitespace_is_left_out(self):
+        rand = random.Random(5)  # noqa: S311
+        for _case in range(100):
+            characters = "ab .,。，\n"  # noqa: RUF001
+            text = "".join(rand.choice(characters) for _index in range(rand.randint(101, 1000)))
+            bounds = list(iter_sentence_bounds(text, 100))
+            self.assertEqual(bounds[0][0], 0)
+            for (_start, end), (next_start, _next_end) in zip(bounds, bounds[1:]):
+                self.assertEqual(text[end:next_start].strip(), "")
+            self.assertEqual(text[bounds[-1][1] :].strip(), "")
+            for start, end in bounds:
+                self.assertLessEqual(end - start, 100)
+
+
+@benchmark
+class WordSplitBenchmark(unittest.TestCase):
+    # Splitting 1 MB of words into chunks of 300 characters: the whole split, the first chunk
+    # and the memory at the peak, building a list of slices as before against yielding offsets.
+    def test_one_megabyte(self):
+        text = random_text(random.Random(6), 1024**2)  # noqa: S311
+        chunk_size = 300
+
+        def first_chunk():
+            start, end = next(iter_word_bounds(text, chunk_size))
+            return text[start:end]
+
+        def old_first_chunk():
+            return old_split_text(text, chunk_size, True)[0]
+
+        self.assertEqual(first_chunk(), old_first_chunk())
+        old_time = best_time(lambda: old_split_text(text, chunk_size, True))
+        new_time = best_time(lambda: list(iter_word_bounds(text, chunk_size)))
+        old_first = best_time(old_first_chunk)
+        new_first = best_time(first_chunk)
+        old_memory = peak_memory(lambda: old_split_text(text, chunk_size, True))
+        new_memory = peak_memory(lambda: sum(1 for _bounds in iter_word_bounds(text, chunk_size)))
+        report(
+            "Word split of 1 MB",
+            before=f"{ms(old_time)} all, {ms(old_first)} first chunk, {kb(old_memory)}",
+            after=f"{ms(new_time)} all, {ms(new_first)} first chunk, {kb(new_memory)}",
+        )
+        self.assertLess(new_first * 100, old_first)
+        self.assertLess(new_memory * 100, old_memory)
+
+
+@benchmark
+class SentenceSplitBenchmark(unittest.TestCase):
+    # Splitting grows linearly with the text: 1 MB takes about ten times as long as 100 KB,
+    # for prose, for text without any boundary, and for text made of boundaries only.
+    def test_linear_time(self):
+        rand = random.Random(7)  # noqa: S311
+        sentence = "Some words, and more words; then the end of a sentence. "
+        for name, unit in (
+            ("prose", lambda: sentence),
+            ("no boundaries", lambda: "x"),
+            ("punctuation", lambda: rand.choice((". ", ", ", "。", " "))),
+        ):
+            times = {}
+            for size in (100 * 1024, 1024**2):
+                text = "".join(unit() for _index in range(size))[:size]
+                times[size] = best_time(lambda text=text: list(iter_sentence_bounds(text, 300)))
+            report(
+                f"Sentence split of {name}",
+                **{"100 KB": ms(times[100 * 1024]), "1 MB": ms(times[1024**2])},
+            )
+            self.assertLess(times[1024**2], times[100 * 1024] * 20)
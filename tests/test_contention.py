@@ -0,0 +1,108 @@
+# test_contention
+# reading the clipboard while another program holds it open.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import time
+
+from autoclip.reader import RetryPolicy
+from autoclip.watcher import UPDATE_QUEUED, UPDATE_RETRY
+
+from . import nvda_stubs
+from .helpers import WatcherTestCase
+
+
+class RecordingReader:
+    # takes the place of the reader thread, so reads and retries happen when the test says
+    def __init__(self):
+        self.posted = []
+        self.retries = []
+
+    def post(self, sequence):
+        self.posted.append(sequence)
+
+    def retry(self, sequence, delay):
+        self.retries.append((sequence, delay))
+
+    def stop(self):
+        pass
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class ContentionTest(WatcherTestCase):
+    def setUp(self):
+        self.make_watcher(start=False)
+        # without jitter, the delays are 10, 20, 40 and 40 ms, adding up to more than the budget
+        self.watcher.retry_policy = RetryPolicy(
+            initial_delay=0.01, max_delay=0.04, budget=0.1, rand=lambda: 0.0
+        )
+
+    def start_recording(self):
+        self.watcher.start(threaded=False)
+        self.reader = RecordingReader()
+        self.watcher.reader = self.reader
+
+    def test_retries_follow_the_policy_until_the_clipboard_opens(self):
+        self.start_recording()
+        self.backend.failing_opens = 2
+        self.backend.set_text("hello")
+        self.assertEqual(self.reader.posted, [1])
+        self.assertEqual(self.watcher.read(1), UPDATE_RETRY)
+        self.assertEqual(self.watcher.read(1), UPDATE_RETRY)
+        self.assertEqual(self.reader.retries, [(1, 0.01), (1, 0.02)])
+        self.assertEqual(self.watcher.read(1), UPDATE_QUEUED)
+        self.assertEqual(self.backend.opens, 3)
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["hello"]])
+
+    def test_backoff_starts_over_after_opening(self):
+        self.start_recording()
+        self.backend.failing_opens = 1
+        self.backend.set_text("first")
+        self.watcher.read(1)
+        self.watcher.read(1)
+        self.backend.failing_opens = 1
+        self.backend.set_text("second")
+        self.watcher.read(2)
+        self.assertEqual(self.reader.retries, [(1, 0.01), (2, 0.01)])
+
+    def test_giving_up_logs_a_single_warning(self):
+        self.start_recording()
+        self.backend.failing_opens = 100
+        self.backend.set_text("hello")
+        with self.assertLogs("nvda", level="WARNING") as logs:
+            for _attempt in range(5):
+                self.assertEqual(self.watcher.read(1), UPDATE_RETRY)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("after 5 attempts", logs.records[0].getMessage())
+        self.assertEqual(
+            [delay for _sequence, delay in self.reader.retries], [0.01, 0.02, 0.04, 0.04]
+        )
+        self.assertEqual(len(self.watcher.pending), 0)
+
+    def test_new_update_takes_over_a_pending_retry(self):
+        self.watcher.retry_policy = RetryPolicy(
+            initial_delay=0.2, max_delay=0.2, budget=1.0, rand=lambda: 0.0
+        )
+        self.watcher.start()
+        self.backend.failing_opens = 1
+        self.backend.set_text("old")
+        self.assertTrue(wait_until(lambda: self.backend.opens == 1))
+        self.backend.set_text("new")
+        self.assertTrue(wait_until(lambda: len(self.watcher.pending) == 1))
+        # the retry would have been due by now
+        time.sleep(0.3)
+        self.assertEqual(self.backend.opens, 2)
+        self.assertEqual(self.watcher.pending.get()[0], "new")
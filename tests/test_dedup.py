@@ -0,0 +1,142 @@
+# test_dedup
+# filtering repeated clipboard text by hash.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import random
+import unittest
+
+from autoclip.dedup import RecentHashes, text_key
+
+from . import nvda_stubs  # noqa: F401
+from .benchmark import benchmark, best_time, report, us
+
+
+class LastData:
+    # the comparison with the previous text that RecentHashes replaced
+    def __init__(self, debounce_delay):
+        self.debounce_delay = debounce_delay
+        self.last_data = ""
+        self.last_time = 0
+
+    def seen(self, data, now):
+        elapsed = now - self.last_time
+        self.last_time = now
+        if self.last_data == data and (elapsed < self.debounce_delay or self.debounce_delay < 0):
+            return True
+        self.last_data = data
+        return False
+
+
+class RecentHashesTest(unittest.TestCase):
+    def test_size_one_matches_the_previous_text_comparison(self):
+        rand = random.Random(8)  # noqa: S311
+        for ttl in (0, 0.5, 2, -1):
+            recent = RecentHashes(size=1, ttl=ttl)
+            last_data = LastData(ttl)
+            now = 0.0
+            for _update in range(2000):
+                now += rand.choice((0.01, 0.3, 1, 3))
+                text = rand.choice("ABC")
+                self.assertEqual(
+                    recent.seen(text_key(text), now), last_data.seen(text, now), (ttl, now)
+                )
+
+    def test_alternating_texts(self):
+        updates = [("A", 0.0), ("B", 0.1), ("A", 0.2), ("B", 0.3), ("C", 0.4), ("A", 0.5)]
+
+        def filtered(size):
+            recent = RecentHashes(size=size, ttl=1)
+            return [recent.seen(text_key(text), now) for text, now in updates]
+
+        self.assertEqual(filtered(1), [False] * 6)
+        self.assertEqual(filtered(2), [False, False, True, True, False, False])
+        self.assertEqual(filtered(3), [False, False, True, True, False, True])
+
+    def test_size_bounds_the_entries(self):
+        recent = RecentHashes(size=3, ttl=1)
+        for index in range(10):
+            recent.seen(text_key(str(index)), index)
+        self.assertEqual(len(recent), 3)
+
+    def test_ttl_zero_never_filters(self):
+        recent = RecentHashes(size=10, ttl=0)
+        key = text_key("A")
+        self.assertEqual([recent.seen(key, now) for now in (0, 0, 0.001)], [False] * 3)
+
+    def test_negative_ttl_never_expires(self):
+        recent = RecentHashes(size=2, ttl=-1)
+        key = text_key("A")
+        self.assertFalse(recent.seen(key, 0))
+        self.assertTrue(recent.seen(key, 1000000))
+        # only leaving the history lets it through again
+        recent.seen(text_key("B"), 1000001)
+        recent.seen(text_key("C"), 1000002)
+        self.assertFalse(recent.seen(key, 1000003))
+
+    def test_ttl_counts_from_the_last_time_seen(self):
+        recent = RecentHashes(size=1, ttl=1)
+        key = text_key("A")
+        self.assertEqual(
+            [recent.seen(key, now) for now in (0, 0.9, 1.8, 3)], [False, True, True, False]
+        )
+
+
+@benchmark
+class DedupBenchmark(unittest.TestCase):
+    # A synthetic stream of 2000 clipboard updates of 10 KB, each a new string as read from the
+    # clipboard, switching between 5 texts in bursts, like a program copying a text repeatedly
+    # and a user going back and forth between texts. The comparison with the previous text as
+    # before, against the history of hashes with one and with 8 entries.
+    updates = 2000
+
+    def test_update_stream(self):
+        candidates = {
+            "previous text": lambda: LastData(1).seen,
+            "1 hash": lambda: self.recent(1),
+            "8 hashes": lambda: self.recent(8),
+        }
+        results = {}
+        for name, make in candidates.items():
+            # a string caches its hash, so each candidate gets new strings, timed once
+            stream = self.update_stream()
+            dedup = make()
+            filtered = []
+            elapsed = best_time(
+                lambda dedup=dedup, stream=stream, filtered=filtered: filtered.append(
+                    sum(dedup(text, now) for text, now in stream)
+                ),
+                repeat=1,
+            )
+            results[name] = (elapsed / len(stream), filtered[0])
+        self.assertEqual(results["previous text"][1], results["1 hash"][1])
+        self.assertGreater(results["8 hashes"][1], results["1 hash"][1])
+        report(
+            "Dedup of 2000 updates of 10 KB",
+            **{
+                name: f"{us(elapsed)} per update, {filtered} filtered"
+                for name, (elapsed, filtered) in results.items()
+            },
+        )
+
+    @classmethod
+    def update_stream(cls):
+        rand = random.Random(9)  # noqa: S311
+        texts = [chr(ord("a") + index) * 10240 for index in range(5)]
+        stream = []
+        now = 0.0
+        while len(stream) < cls.updates:
+            text = rand.choice(texts)
+            for _update in range(rand.randint(1, 9)):
+                now += rand.choice((0.01, 0.1, 0.5))
+                stream.append((text[:-1] + text[-1], now))
+        return stream[: cls.updates]
+
+    @staticmethod
+    def recent(size):
+        recent = RecentHashes(size=size, ttl=1)
+        return lambda text, now: recent.seen(text_key(text), now)
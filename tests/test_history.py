@@ -0,0 +1,89 @@
+# test_history
+# the history of spoken clipboard texts.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import unittest
+
+from autoclip.dedup import text_key
+from autoclip.history import ClipboardHistory
+
+from . import nvda_stubs  # noqa: F401
+
+
+def entries(history):
+    # newest first
+    texts = []
+    history.position = None
+    text = history.move(1)
+    while text is not None:
+        texts.append(text)
+        text = history.move(1)
+    history.position = None
+    return texts
+
+
+class ClipboardHistoryTest(unittest.TestCase):
+    def test_entry_count_evicts_oldest(self):
+        history = ClipboardHistory(max_entries=3, max_chars=1000)
+        for text in ("one", "two", "three", "four"):
+            history.add(text)
+        self.assertEqual(entries(history), ["four", "three", "two"])
+        self.assertEqual(history.chars, len("fourthreetwo"))
+
+    def test_character_cap_evicts_oldest(self):
+        history = ClipboardHistory(max_entries=100, max_chars=10)
+        for text in ("aaaa", "bbbb", "cccc"):
+            history.add(text)
+        self.assertEqual(entries(history), ["cccc", "bbbb"])
+        self.assertEqual(history.chars, 8)
+        # one large entry can evict several small ones
+        history.add("dddddddd")
+        self.assertEqual(entries(history), ["dddddddd"])
+        self.assertEqual(history.chars, 8)
+
+    def test_readding_moves_to_the_end_without_duplicating(self):
+        history = ClipboardHistory(max_entries=3, max_chars=1000)
+        for text in ("one", "two", "one"):
+            history.add(text)
+        self.assertEqual(entries(history), ["one", "two"])
+        self.assertEqual(history.chars, len("onetwo"))
+        # the key computed for filtering repeats is reused
+        history.add("two", text_key("two"))
+        self.assertEqual(entries(history), ["two", "one"])
+        self.assertEqual(len(history), 2)
+
+    def test_oversized_entry_is_rejected(self):
+        history = ClipboardHistory(max_entries=10, max_chars=10)
+        history.add("short")
+        history.add("x" * 11)
+        self.assertEqual(entries(history), ["short"])
+        self.assertEqual(history.chars, 5)
+
+    def test_resize_shrinks(self):
+        history = ClipboardHistory(max_entries=10, max_chars=1000)
+        for text in ("one", "two", "three", "four", "five"):
+            history.add(text)
+        history.resize(3, 1000)
+        self.assertEqual(entries(history), ["five", "four", "three"])
+        history.resize(3, 8)
+        self.assertEqual(entries(history), ["five", "four"])
+        self.assertEqual(history.chars, 8)
+        history.resize(0, 8)
+        self.assertEqual(len(history), 0)
+        self.assertEqual(history.chars, 0)
+
+    def test_review_stops_at_either_end(self):
+        history = ClipboardHistory()
+        history.add("old")
+        history.add("new")
+        self.assertEqual(history.move(1), "new")
+        self.assertEqual(history.move(1), "old")
+        self.assertIsNone(history.move(1))
+        self.assertEqual(history.current(), "old")
+        self.assertEqual(history.move(-1), "new")
+        self.assertIsNone(history.move(-1))
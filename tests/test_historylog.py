@@ -0,0 +1,97 @@
+# test_historylog
+# the compressed history log on disk.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import os
+import tempfile
+import unittest
+
+from autoclip.historylog import (
+    INDEX_RECORD,
+    HistoryLog,
+    entries_between,
+    log_numbers,
+    read_index,
+    search,
+)
+
+from . import nvda_stubs  # noqa: F401
+
+
+class HistoryLogTest(unittest.TestCase):
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = temporary.name
+
+    def write(self, entries, **options):
+        # entries are (timestamp, text), everything is written once the log is stopped
+        history_log = HistoryLog(self.directory, **options)
+        history_log.start()
+        for timestamp, text in entries:
+            history_log.add(text, timestamp)
+        history_log.stop()
+
+    def test_search_newest_first(self):
+        self.write(
+            [(1.0, "Gold found"), (2.0, "HP low"), (3.0, "more gold"), (4.0, "GOLD again")],
+            batch_size=2,
+        )
+        self.assertEqual(len(read_index(self.directory, 1)), 2)
+        self.assertEqual(
+            search(self.directory, "gold"),
+            [(4.0, "GOLD again"), (3.0, "more gold"), (1.0, "Gold found")],
+        )
+        self.assertEqual(
+            search(self.directory, "gold", limit=2), [(4.0, "GOLD again"), (3.0, "more gold")]
+        )
+        self.assertEqual(search(self.directory, "mana"), [])
+
+    def test_entries_between(self):
+        self.write(
+            [(float(timestamp), f"entry {timestamp}") for timestamp in range(10)], batch_size=3
+        )
+        self.assertEqual(
+            entries_between(self.directory, 2.0, 5.0),
+            [(2.0, "entry 2"), (3.0, "entry 3"), (4.0, "entry 4"), (5.0, "entry 5")],
+        )
+        self.assertEqual(entries_between(self.directory, 8.0), [(8.0, "entry 8"), (9.0, "entry 9")])
+        self.assertEqual(entries_between(self.directory, 20.0), [])
+
+    def test_rotation_keeps_max_files(self):
+        # every batch is bigger than the maximum file size, so each one starts a new file
+        self.write(
+            [(float(timestamp), f"entry {timestamp}") for timestamp in range(5)],
+            batch_size=1,
+            max_file_size=1,
+            max_files=2,
+        )
+        self.assertEqual(log_numbers(self.directory), [4, 5])
+        self.assertEqual(sorted(os.listdir(self.directory))[0], "history-000004.idx")
+        self.assertEqual(search(self.directory, "entry"), [(4.0, "entry 4"), (3.0, "entry 3")])
+
+    def test_continues_after_a_partly_written_batch(self):
+        self.write([(1.0, "first"), (2.0, "second")], batch_size=1)
+        log_path = os.path.join(self.directory, "history-000001.log")
+        index_path = os.path.join(self.directory, "history-000001.idx")
+        written = os.path.getsize(log_path)
+        # as if NVDA stopped while writing a batch
+        with open(log_path, "ab") as file:
+            file.write(b"partial batch")
+        with open(index_path, "ab") as file:
+            file.write(b"\0" * (INDEX_RECORD.size // 2))
+        self.assertEqual(len(read_index(self.directory, 1)), 2)
+        self.write([(3.0, "third")])
+        records = read_index(self.directory, 1)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[-1][2], written)
+        self.assertEqual(os.path.getsize(index_path), 3 * INDEX_RECORD.size)
+        self.assertEqual(os.path.getsize(log_path), written + records[-1][3])
+        self.assertEqual(
+            entries_between(self.directory, 0.0), [(1.0, "first"), (2.0, "second"), (3.0, "third")]
+        )
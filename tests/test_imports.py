@@ -0,0 +1,79 @@
+# test_imports
+# what loading the global plugin imports, and how long it takes.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import os
+import subprocess
+import sys
+import unittest
+
+from .benchmark import benchmark, ms, report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# imported once automatic reading is enabled, or a feature needing them is used
+DEFERRED_MODULES = ("autoclip.watcher", "autoclip.winclip", "autoclip.historylog", "autoclip.rules")
+# imported at load time before the watcher was deferred, winclip needs Windows so it's left out
+EAGER_MODULES = ("autoclip.watcher", "autoclip.historylog", "autoclip.rules")
+# importing tests installs the NVDA stubs and loads the plugin, in a fresh interpreter
+LOAD_PLUGIN = "import tests"
+
+
+def run_python(code, *options):
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(code):
+    # microseconds of each module imported by code, as (self, cumulative) by module name
+    times = {}
+    for line in run_python(code, "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+        except ValueError:
+            # the header line
+            continue
+    return times
+
+
+def addon_time(times):
+    # seconds spent importing the add-on, its own modules and what they import first
+    return times["autoclip"][1] / 1_000_000
+
+
+class PluginImportsTest(unittest.TestCase):
+    def test_loading_defers_the_watcher(self):
+        code = LOAD_PLUGIN + "\nimport sys\nprint('\\n'.join(sys.modules))"
+        modules = set(run_python(code).stdout.split())
+        self.assertIn("autoclip", modules)
+        for name in DEFERRED_MODULES:
+            self.assertNotIn(name, modules)
+
+
+@benchmark
+class PluginImportBenchmark(unittest.TestCase):
+    # Importing the plugin as NVDA loads it, against also importing what was imported at load time
+    # before the watcher was deferred, from python -X importtime in a fresh interpreter.
+    def test_load_time(self):
+        eager = LOAD_PLUGIN + "".join(f"\nimport {name}" for name in EAGER_MODULES)
+        lazy_times = [addon_time(import_times(LOAD_PLUGIN)) for _run in range(5)]
+        eager_times = []
+        for _run in range(5):
+            times = import_times(eager)
+            eager_times.append(
+                addon_time(times) + sum(times[name][1] for name in EAGER_MODULES) / 1_000_000
+            )
+        report("Plugin load", deferred=ms(min(lazy_times)), eager=ms(min(eager_times)))
+        self.assertLess(min(lazy_times), min(eager_times))
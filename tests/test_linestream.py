@@ -0,0 +1,115 @@
+# test_linestream
+# speaking only the new lines of clipboard text appended to like a log.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import time
+import unittest
+
+from autoclip.linestream import LineStream
+
+from . import nvda_stubs
+from .benchmark import benchmark, report, us
+from .helpers import WatcherTestCase
+
+
+class LineStreamTest(unittest.TestCase):
+    def test_only_the_last_max_lines_are_examined(self):
+        lines = LineStream(max_lines=3)
+        text = "\n".join(f"line {number}" for number in range(10))
+        self.assertEqual(lines.new_lines(text), "line 7\nline 8\nline 9")
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines.new_lines(text + "\nline 10"), "line 10")
+        self.assertEqual(len(lines), 3)
+
+    def test_lines_longer_than_guessed(self):
+        lines = LineStream(max_lines=3)
+        text = "\n".join(str(number) * 500 for number in range(10))
+        self.assertEqual(
+            lines.new_lines(text), "\n".join(str(number) * 500 for number in (7, 8, 9))
+        )
+        self.assertEqual(lines.new_lines("x" * 10000), "x" * 10000)
+
+    def test_blank_and_repeated_lines(self):
+        lines = LineStream()
+        self.assertEqual(lines.new_lines("a\n\n  \nb"), "a\nb")
+        self.assertEqual(lines.new_lines("a\nb\nc\nc"), "c\nc")
+        self.assertEqual(lines.new_lines("a\nb\nc"), "")
+
+    def test_resize_forgets_the_oldest_lines(self):
+        lines = LineStream()
+        lines.new_lines("a\nb\nc")
+        lines.resize(2)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines.new_lines("a"), "a")
+
+
+class LineStreamWatcherTest(WatcherTestCase):
+    def test_speaks_new_lines_only(self):
+        self.make_watcher(lineStream=True, debounceDelay=0)
+        self.set_texts(
+            "HP 3\nGold 5",
+            "HP 3\nGold 5\nMP 4",
+            "HP 3\nGold 5\nMP 4",
+            "Gold 5\nMP 4\nXP 1",
+        )
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["HP 3\nGold 5"], ["MP 4"], ["XP 1"]])
+
+    def test_longer_text_is_read_from_its_end(self):
+        self.make_watcher(lineStream=True, debounceDelay=0, maxLength=20)
+        # 28 characters, of which the last 21 are read, cutting "first line" in the middle
+        self.set_texts("first line\nsecond line\nthird")
+        self.set_texts("first line\nsecond line\nthird\nfourth")
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["second line\nthird"], ["fourth"]])
+
+    def test_lines_examined_are_bounded_by_the_setting(self):
+        self.make_watcher(lineStream=True, debounceDelay=0, lineStreamLines=2)
+        self.assertEqual(self.watcher.lines.max_lines, 2)
+        self.set_texts("one\ntwo\nthree\nfour")
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["three\nfour"]])
+
+
+class AllLines:
+    # remembering every line of the text, to compare with
+    def __init__(self):
+        self._seen = set()
+
+    def new_lines(self, text):
+        new = [line for line in text.split("\n") if line.strip() and line not in self._seen]
+        self._seen.update(new)
+        return "\n".join(new)
+
+
+@benchmark
+class LineStreamBenchmark(unittest.TestCase):
+    # A log of 1,000, 10,000 and 100,000 lines read again after each line appended to it.
+    # The time of one update stays the same however long the log grows, unlike with every line
+    # of the text examined.
+    def test_growing_log(self):
+        results = {}
+        for count in (1000, 10_000, 100_000):
+            log = "\n".join(
+                f"{number:08d} some event happened with a value" for number in range(count)
+            )
+            times = {}
+            for name, make in (("line stream", LineStream), ("all lines", AllLines)):
+                lines = make()
+                lines.new_lines(log)
+                elapsed = []
+                text = log
+                for number in range(count, count + 20):
+                    text += f"\n{number:08d} appended"
+                    start = time.perf_counter()
+                    self.assertEqual(lines.new_lines(text), f"{number:08d} appended")
+                    elapsed.append(time.perf_counter() - start)
+                times[name] = min(elapsed)
+            results[count] = times
+            report(f"{count} lines", **{name: us(elapsed) for name, elapsed in times.items()})
+        self.assertLess(results[100_000]["line stream"], results[1000]["line stream"] * 2)
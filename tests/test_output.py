@@ -0,0 +1,39 @@
+# test_output
+# handing clipboard text to speech and braille.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import unittest
+
+from autoclip.output import TextOutput
+from speech.commands import EndUtteranceCommand
+
+from . import nvda_stubs
+
+
+class TextOutputTest(unittest.TestCase):
+    def setUp(self):
+        nvda_stubs.reset()
+        self.output = TextOutput(call_later=lambda delay, func: None, clock=lambda: 0.0)
+
+    def test_chunks_are_separate_utterances(self):
+        self.output.speak(["one. ", "two. ", "three."])
+        self.assertEqual(
+            nvda_stubs.spoken,
+            [["one. ", EndUtteranceCommand(), "two. ", EndUtteranceCommand(), "three."]],
+        )
+
+    def test_callback_follows_the_last_chunk(self):
+        self.output.speak(iter(["one. ", "two."]), on_done=lambda: None)
+        sequence = nvda_stubs.spoken[0]
+        self.assertEqual(sequence[:3], ["one. ", EndUtteranceCommand(), "two."])
+        self.assertEqual(sequence[3].name, "autoclip.chunkDone")
+
+    def test_braille_shows_the_whole_text_once(self):
+        self.output.message("one. two.")
+        self.assertEqual(nvda_stubs.spoken, [["one. two."]])
+        self.assertEqual(nvda_stubs.braille_messages, ["one. two."])
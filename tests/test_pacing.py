@@ -0,0 +1,204 @@
+# test_pacing
+# handing chunks of text to speech a few at a time.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import time
+import unittest
+from unittest import mock
+
+from autoclip import pacing
+from autoclip.chunking import split_text
+from autoclip.pacing import ChunkPacer
+
+from . import nvda_stubs
+from .benchmark import benchmark, best_time, ms, report
+from .helpers import WatcherTestCase
+
+
+class FakeSpeech:
+    # Takes the place of speech for the pacer. Sequences are spoken in order when finish is called,
+    # unless speech is off, in which case on_done callbacks are never called, like NVDA does.
+    def __init__(self):
+        self.spoken = []
+        self.callbacks = []
+        self.off = False
+        self.scheduled = []
+        self.delayed = []  # (delay, func) passed to call_later
+
+    def speak(self, chunks, on_done):
+        self.spoken.append(chunks)
+        if on_done is not None and not self.off:
+            self.callbacks.append(on_done)
+
+    def finish(self):
+        # the oldest sequence still being spoken is done
+        self.callbacks.pop(0)()
+
+    def schedule(self, func, *args):
+        self.scheduled.append((func, args))
+
+    def call_later(self, delay, func):
+        self.delayed.append((delay, func))
+
+    def pacer(self, lookahead=1):
+        return ChunkPacer(self.speak, lookahead, schedule=self.schedule, call_later=self.call_later)
+
+
+class ChunkPacerTest(unittest.TestCase):
+    def setUp(self):
+        self.speech = FakeSpeech()
+
+    def test_next_chunk_is_spoken_when_one_is_done(self):
+        pacer = self.speech.pacer()
+        pacer.add(["a", "b", "c"])
+        self.assertEqual(self.speech.spoken, [["a"]])
+        self.speech.finish()
+        self.assertEqual(self.speech.spoken, [["a"], ["b"]])
+        self.speech.finish()
+        self.speech.finish()
+        self.assertEqual(self.speech.spoken, [["a"], ["b"], ["c"]])
+        self.assertFalse(pacer.busy)
+
+    def test_lookahead_chunks_at_a_time_lazily(self):
+        split = []
+
+        def chunks():
+            for chunk in "abcd":
+                split.append(chunk)
+                yield chunk
+
+        pacer = self.speech.pacer(lookahead=2)
+        pacer.add(chunks())
+        self.assertEqual(self.speech.spoken, [["a"], ["b"]])
+        self.assertEqual(split, ["a", "b"])
+        self.speech.finish()
+        self.assertEqual(self.speech.spoken, [["a"], ["b"], ["c"]])
+        self.assertEqual(split, ["a", "b", "c"])
+
+    def test_texts_are_spoken_in_order(self):
+        pacer = self.speech.pacer()
+        pacer.add(["a", "b"])
+        pacer.add(["c"])
+        for _chunk in range(3):
+            self.speech.finish()
+        self.assertEqual(self.speech.spoken, [["a"], ["b"], ["c"]])
+
+    def test_callbacks_of_canceled_chunks_are_ignored(self):
+        pacer = self.speech.pacer()
+        pacer.add(["a", "b"])
+        pacer.cancel()
+        self.assertFalse(pacer.busy)
+        pacer.add(["c", "d"])
+        # a was canceled, it being done must not let d through before c is done
+        self.speech.finish()
+        self.assertEqual(self.speech.spoken, [["a"], ["c"]])
+        self.speech.finish()
+        self.assertEqual(self.speech.spoken, [["a"], ["c"], ["d"]])
+
+    def test_without_lookahead_everything_is_spoken_at_once(self):
+        pacer = self.speech.pacer(lookahead=0)
+        pacer.add(["a", "b", "c"])
+        # the first chunk is spoken before the rest is split
+        self.assertEqual(self.speech.spoken, [["a"], ["b", "c"]])
+        self.assertEqual(self.speech.callbacks, [])
+        self.assertFalse(pacer.busy)
+
+    def test_without_lookahead_splitting_is_spread_over_time_slices(self):
+        pacer = self.speech.pacer(lookahead=0)
+        with mock.patch.object(pacing, "TIME_SLICE", 0):
+            pacer.add(["a", "b", "c"])
+            self.assertEqual(self.speech.spoken, [["a"]])
+            self.assertEqual(len(self.speech.scheduled), 1)
+            func, args = self.speech.scheduled.pop()
+            func(*args)
+        self.assertEqual(self.speech.spoken, [["a"], ["b"]])
+
+    def test_watchdog_takes_a_chunk_as_spoken(self):
+        self.speech.off = True
+        pacer = self.speech.pacer()
+        pacer.add(["a", "bcd"])
+        self.assertEqual(len(self.speech.delayed), 1)
+        delay, watchdog = self.speech.delayed.pop()
+        self.assertEqual(delay, pacing.WATCHDOG_DELAY + pacing.WATCHDOG_DELAY_PER_CHARACTER)
+        watchdog()
+        self.assertEqual(self.speech.spoken, [["a"], ["bcd"]])
+        self.speech.delayed.pop()[1]()
+        self.assertFalse(pacer.busy)
+
+    def test_watchdog_after_the_chunk_was_spoken_does_nothing(self):
+        pacer = self.speech.pacer()
+        pacer.add(["a", "b", "c"])
+        self.speech.finish()
+        # a's watchdog must not take b as spoken
+        self.speech.delayed[0][1]()
+        self.assertEqual(self.speech.spoken, [["a"], ["b"]])
+
+
+class PacedWatcherTest(WatcherTestCase):
+    def test_updates_are_spoken_when_callbacks_never_run(self):
+        # as with speech off: the speech manager never calls the callback of the first text
+        self.make_watcher(speechLookahead=1, debounceDelay=0)
+        self.set_texts("first", "second", "third")
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken[0][0], "first")
+        self.assertEqual(len(nvda_stubs.spoken), 1)
+        for _text in range(2):
+            nvda_stubs.run_delayed()
+            nvda_stubs.pump()
+        self.assertEqual(
+            [sequence[0] for sequence in nvda_stubs.spoken], ["first", "second", "third"]
+        )
+        self.assertTrue(self.watcher.pacer.busy)
+        nvda_stubs.run_delayed()
+        self.assertFalse(self.watcher.pacer.busy)
+
+
+@benchmark
+class FirstChunkBenchmark(WatcherTestCase):
+    # Time from a text of 1 KB or 1 MB being put on the clipboard to its first chunk being handed to
+    # speech, with no lookahead, and the longest function run on the main thread meanwhile.
+    # Without the pacer, the whole text was split and queued in a single function,
+    # so the time taken by the whole split is reported too.
+    def measure(self, text, **overrides):
+        self.make_watcher(speechLookahead=0, maxLength=len(text) + 1, debounceDelay=0, **overrides)
+        first = []
+
+        def speak(sequence, *args, **kwargs):
+            if not first:
+                first.append(time.perf_counter())
+
+        longest = 0.0
+        with mock.patch("speech.speak", speak):
+            self.clock.advance(1)
+            start = time.perf_counter()
+            self.backend.set_text(text)
+            while nvda_stubs.queued:
+                func, args = nvda_stubs.queued.pop(0)
+                func_start = time.perf_counter()
+                func(*args)
+                longest = max(longest, time.perf_counter() - func_start)
+        return first[0] - start, longest
+
+    def test_first_chunk(self):
+        sentence = "Some words, and more words; then the end of a sentence. "
+        for split in ("splitAtWordBounds", "splitAtSentenceBounds"):
+            results = {}
+            for name, size in (("1 KB", 1024), ("1 MB", 1024**2)):
+                text = (sentence * (size // len(sentence) + 1))[:size]
+                runs = [self.measure(text, **{split: True}) for _run in range(5)]
+                whole = best_time(lambda text=text: split_text(text, 500, self.watcher.splitter))
+                results[name] = (min(run[0] for run in runs), min(run[1] for run in runs), whole)
+            report(
+                f"First chunk with {split}",
+                **{
+                    name: f"{ms(first)}, longest event {ms(longest)}, whole split {ms(whole)}"
+                    for name, (first, longest, whole) in results.items()
+                },
+            )
+            self.assertLess(results["1 MB"][0], 0.01)
+            self.assertLess(results["1 MB"][1], 0.05)
@@ -0,0 +1,57 @@
+# test_pause
+# pausing and resuming the clipboard watcher when automatic reading is toggled.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import gc
+import threading
+import tracemalloc
+from autoclip.watcher import UPDATE_SKIPPED
+
+from . import nvda_stubs
+from .helpers import WatcherTestCase
+
+TOGGLES = 10000
+MAX_MEMORY_GROWTH = 64 * 1024
+
+
+class PauseTest(WatcherTestCase):
+    def test_updates_while_paused_are_not_read(self):
+        self.make_watcher(debounceDelay=0)
+        self.watcher.pause()
+        self.set_texts("while paused")
+        self.assertEqual(self.backend.opens, 0)
+        self.watcher.resume()
+        # the clipboard as it was while paused is only read on its next change
+        self.assertEqual(self.watcher.read(self.backend.sequence_number()), UPDATE_SKIPPED)
+        self.set_texts("after resuming")
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["after resuming"]])
+
+    def test_soak_toggling(self):
+        watcher = self.make_watcher(threaded=True)
+
+        def toggle(count):
+            for _toggle in range(count):
+                watcher.pause()
+                watcher.resume()
+
+        # warm up, so caches filled on first use are not counted as growth
+        toggle(100)
+        gc.collect()
+        threads = threading.active_count()
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        before = tracemalloc.take_snapshot()
+        toggle(TOGGLES)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        self.assertLess(growth, MAX_MEMORY_GROWTH)
+        self.assertEqual(threading.active_count(), threads)
+        self.assertEqual(self.backend.on_update, watcher.notify)
+        self.assertEqual(len(watcher.pending), 0)
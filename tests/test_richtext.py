@@ -0,0 +1,116 @@
+# test_richtext
+# converting HTML and RTF clipboard content to text.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import html.parser
+import unittest
+
+from autoclip import DEFAULT_MAX_LENGTH
+from autoclip.richtext import cf_html_to_text, html_to_text, rtf_to_text
+
+from . import nvda_stubs  # noqa: F401
+from .benchmark import benchmark, best_time, kb, ms, peak_memory, report
+
+
+class RtfTest(unittest.TestCase):
+    def test_text_and_formatting(self):
+        rtf = (
+            rb"{\rtf1\ansi\ansicpg1252{\fonttbl{\f0 Arial;}}{\*\generator Msftedit;}"
+            rb"\f0 Hello \b bold\b0  caf\'e9\par Second\tab x\par}"
+        )
+        self.assertEqual(rtf_to_text(rtf), "Hello bold café\nSecond\tx")
+
+    def test_unicode_with_fallback(self):
+        rtf = b"{\\rtf1 a\\u8364?b {\\uc2\\u8364xyc}}"
+        self.assertEqual(rtf_to_text(rtf), "a€b €c")
+
+    def test_code_page_and_symbols(self):
+        rtf = rb"{\rtf1\ansicpg1251 \'c0\{x\}\~y\\z\emdash}"
+        self.assertEqual(rtf_to_text(rtf), "\u0410{x}\u00a0y\\z\u2014")
+
+    def test_longer_than_max_length(self):
+        rtf = b"{\\rtf1 " + b"word " * 100 + b"}"
+        self.assertEqual(rtf_to_text(rtf, 50), "")
+        self.assertEqual(rtf_to_text(rtf, 1000), ("word " * 100).strip())
+
+
+class HtmlTest(unittest.TestCase):
+    def test_tags_scripts_and_entities(self):
+        html = "<style>p{}</style><p>Hello &amp; <b>world</b></p><script>x</script><div>two</div>"
+        self.assertEqual(html_to_text(html), "Hello & world\ntwo")
+
+
+class TextCollector(html.parser.HTMLParser):
+    # text extraction with the standard library parser, to compare with
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def html_parser_text(markup):
+    parser = TextCollector()
+    parser.feed(markup)
+    parser.close()
+    return "".join(parser.parts)
+
+
+def cf_html(fragment):
+    # the "HTML Format" clipboard format, with its header of byte offsets
+    header = (
+        "Version:0.9\r\nStartHTML:{:010d}\r\nEndHTML:{:010d}\r\n"
+        "StartFragment:{:010d}\r\nEndFragment:{:010d}\r\n"
+    )
+    body = f"<html><body><!--StartFragment-->{fragment}<!--EndFragment--></body></html>"
+    start = len(header.format(0, 0, 0, 0))
+    data = body.encode("utf-8")
+    fragment_start = start + data.index(b"-->") + 3
+    fragment_end = start + data.index(b"<!--EndFragment")
+    return header.format(start, start + len(data), fragment_start, fragment_end).encode() + data
+
+
+@benchmark
+class HtmlBenchmark(unittest.TestCase):
+    # HTML of 1 MB and 10 MB as copied from a web page, with styles, scripts, a table and links.
+    # The whole conversion, the conversion bounded by the default maximum length, and the
+    # standard library parser collecting the text of the same markup.
+    def test_large_documents(self):
+        row = (
+            '<tr><td class="name"><a href="https://example.com/item?id=1&amp;x=2">Item &eacute;</a>'
+            "</td><td>Some text in a cell, with <b>bold</b> and <i>italics</i>.</td></tr>\n"
+        )
+        page = "<style>td { padding: 1px }</style><script>var x = '<p>';</script><table>{}</table>"
+        for name, size in (("1 MB", 1024**2), ("10 MB", 10 * 1024**2)):
+            markup = page.replace("{}", row * (size // len(row)))
+            data = cf_html(markup)
+            full = best_time(lambda data=data: cf_html_to_text(data), repeat=3)
+            bounded = best_time(lambda data=data: cf_html_to_text(data, DEFAULT_MAX_LENGTH))
+            bounded_memory = peak_memory(
+                lambda data=data: cf_html_to_text(data, DEFAULT_MAX_LENGTH)
+            )
+            parser = best_time(lambda markup=markup: html_parser_text(markup), repeat=1)
+            report(
+                f"{name} of HTML",
+                full=ms(full),
+                bounded=f"{ms(bounded)} {kb(bounded_memory)}",
+                html_parser=ms(parser),
+            )
+            self.assertEqual(cf_html_to_text(data, DEFAULT_MAX_LENGTH), "")
+            self.assertLess(bounded * 10, full)
@@ -0,0 +1,86 @@
+# test_rules
+# ignore and replacement rules applied to clipboard text before it's spoken.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import random
+import unittest
+
+from autoclip import DEFAULT_MAX_LENGTH
+from autoclip.rules import TextRules, find_invalid_rule
+
+from . import nvda_stubs  # noqa: F401
+from .benchmark import benchmark, best_time, ms, report
+
+
+class TextRulesTest(unittest.TestCase):
+    def test_ignored_lines_and_replacements(self):
+        rules = TextRules(
+            [r"^DEBUG", r"password"], [r"(\d+) ms => \1 milliseconds", "ERROR => error"]
+        )
+        text = "DEBUG start\nERROR after 20 ms\nthe password is x\ndone"
+        self.assertEqual(rules.apply(text), "error after 20 milliseconds\ndone")
+
+    def test_first_rule_wins_and_replacements_are_not_matched_again(self):
+        rules = TextRules(replacements=["abc => x", "ab => y", "x => z"])
+        self.assertEqual(rules.apply("abc ab x"), "x y z")
+
+    def test_backreferences_are_applied_in_turn(self):
+        rules = TextRules(replacements=[r"(\w)\1 => \1", "a => b"])
+        self.assertIsNone(rules.combined_replace)
+        self.assertEqual(rules.apply("aa c"), "b c")
+
+    def test_every_line_ignored(self):
+        self.assertEqual(TextRules([r"."]).apply("one\ntwo"), "")
+
+    def test_invalid_rules(self):
+        self.assertEqual(find_invalid_rule(["ok"], ["(bad => x"])[0], "(bad => x")
+        self.assertIsNone(find_invalid_rule(["ok"], ["fine => x"]))
+        with self.assertLogs("nvda", level="WARNING"):
+            rules = TextRules(["[bad"], ["good => better"])
+        self.assertEqual(rules.apply("good"), "better")
+
+    def test_time_budget(self):
+        rules = TextRules([r"never"], time_budget=0)
+        with self.assertLogs("nvda", level="WARNING"):
+            self.assertEqual(rules.apply("never\nnever"), "never\nnever")
+        self.assertTrue(rules.timed_out)
+
+
+@benchmark
+class RulesBenchmark(unittest.TestCase):
+    # 100 ignore patterns and 100 replacements, like a user's list of words to skip or spell out,
+    # on 15,000 characters of lines of words. The combined patterns against the same rules applied
+    # one after the other, as when they can't be combined.
+    def test_hundred_rules(self):
+        rand = random.Random(17)  # noqa: S311
+        words = ["".join(rand.choice("abcdefghij") for _index in range(6)) for _word in range(500)]
+        ignore = [rf"^{word} \d+" for word in words[:100]]
+        replacements = [rf"\b{word}\b => {word.upper()}" for word in words[100:200]]
+        lines = []
+        length = 0
+        while length < DEFAULT_MAX_LENGTH:
+            line = " ".join(rand.choice(words) for _word in range(8))
+            lines.append(line)
+            length += len(line) + 1
+        text = "\n".join(lines)[:DEFAULT_MAX_LENGTH]
+
+        combined = TextRules(ignore, replacements, time_budget=10)
+        separate = TextRules(ignore, replacements, time_budget=10)
+        separate.combined_ignore = separate.combined_replace = None
+        self.assertIsNotNone(combined.combined_ignore)
+        self.assertIsNotNone(combined.combined_replace)
+        self.assertEqual(combined.apply(text), separate.apply(text))
+
+        combined_time = best_time(lambda: combined.apply(text))
+        separate_time = best_time(lambda: separate.apply(text), repeat=3)
+        report(
+            "100 + 100 rules on 15,000 characters",
+            combined=f"{ms(combined_time)} ({len(text) / combined_time / 1e6:.1f}M chars/s)",
+            separate=f"{ms(separate_time)} ({len(text) / separate_time / 1e6:.1f}M chars/s)",
+        )
+        self.assertLess(combined_time, separate_time)
@@ -0,0 +1,51 @@
+# test_stats
+# counters and stage timings of the clipboard reading pipeline.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import unittest
+
+from autoclip.stats import Histogram, stats
+
+from . import nvda_stubs
+from .helpers import WatcherTestCase
+
+
+class HistogramTest(unittest.TestCase):
+    def test_percentiles_are_bucket_bounds(self):
+        histogram = Histogram()
+        for microseconds in (3, 3, 3, 100):
+            histogram.add(microseconds / 1_000_000)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.percentile(0.5), 4 / 1_000_000)
+        self.assertEqual(histogram.percentile(1), histogram.max)
+
+
+class StageTimingTest(WatcherTestCase):
+    def setUp(self):
+        # enabled by the watcher from collectStatistics
+        stats.reset()
+        self.addCleanup(stats.reset)
+        self.addCleanup(setattr, stats, "enabled", False)
+
+    def test_nothing_is_collected_when_disabled(self):
+        self.make_watcher(chunkSize=100)
+        self.set_texts("word " * 100)
+        nvda_stubs.pump()
+        self.assertEqual(stats.summary(), "")
+
+    def test_pipeline_stages_are_timed(self):
+        self.make_watcher(collectStatistics=True, chunkSize=100, debounceDelay=0)
+        self.set_texts("word " * 100, "short")
+        nvda_stubs.pump()
+        self.assertEqual(stats.counters["notifications"], 2)
+        self.assertEqual(stats.counters["spoken"], 2)
+        for stage in ("read", "handleText", "messageText"):
+            self.assertEqual(stats.histograms[stage].count, 2, stage)
+        # only the long text is split, once however many chunks it has
+        self.assertEqual(stats.histograms["splitText"].count, 1)
+        self.assertEqual(nvda_stubs.spoken[0], ["word " * 20])
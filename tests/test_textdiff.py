@@ -0,0 +1,96 @@
+# test_textdiff
+# speaking only what changed in the clipboard text.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import difflib
+import random
+import unittest
+
+from autoclip.textdiff import changed_text
+
+from . import nvda_stubs
+from .benchmark import benchmark, best_time, ms, report
+from .helpers import WatcherTestCase
+
+
+class ChangedTextTest(unittest.TestCase):
+    def test_appended_lines_and_words(self):
+        self.assertEqual(changed_text("Gold 5\nHP 3", "Gold 5\nHP 3\nMP 4"), "\nMP 4")
+        self.assertEqual(changed_text("Gold 5\nHP 3\n", "Gold 5\nHP 3\nMP 4"), "MP 4")
+        self.assertEqual(changed_text("You have 5", "You have 5 gold"), " gold")
+
+    def test_extended_word_is_spoken_whole(self):
+        self.assertEqual(changed_text("Health: 10", "Health: 100"), "100")
+        self.assertEqual(changed_text("You have 5 gold", "You have 50 gold"), "50")
+
+    def test_extended_line_is_spoken_whole(self):
+        self.assertEqual(changed_text("Gold 5\nHP 3", "Gold 5\nHP 30"), "HP 30")
+
+    def test_unchanged(self):
+        self.assertEqual(changed_text("Gold 5\nHP 3", "Gold 5\nHP 3"), "")
+
+
+class ChangesOnlyWatcherTest(WatcherTestCase):
+    def test_speaks_whole_changed_tokens(self):
+        self.make_watcher(speakChangesOnly=True, debounceDelay=0)
+        self.set_texts("Health: 10", "Health: 100", "Gold 5\nHP 3", "Gold 5\nHP 30")
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["Health: 10"], ["100"], ["Gold 5\nHP 3"], ["HP 30"]])
+
+
+def full_diff(old, new):
+    # difflib over every line or word without trimming or a limit, to compare with
+    multiline = "\n" in old or "\n" in new
+    old_units = old.split("\n") if multiline else old.split()
+    new_units = new.split("\n") if multiline else new.split()
+    matcher = difflib.SequenceMatcher(None, old_units, new_units, autojunk=False)
+    return [tag for tag, *_indexes in matcher.get_opcodes() if tag in ("replace", "insert")]
+
+
+@benchmark
+class ChangedTextBenchmark(unittest.TestCase):
+    # Texts of 15,000 characters, as lines of a log and as a single line of words: appending,
+    # editing a few units at random, and editing units throughout the text, which is above
+    # MAX_DIFF_UNITS after trimming. changed_text against difflib over all of the units.
+    size = 15000
+
+    def test_workloads(self):
+        rand = random.Random(10)  # noqa: S311
+        for multiline in (True, False):
+            separator = "\n" if multiline else " "
+            unit_length = 40 if multiline else 6
+            units = [
+                "".join(rand.choice("abcdefgh ") for _index in range(unit_length)).strip() or "x"
+                for _unit in range(self.size // (unit_length + 1))
+            ]
+            for name, edit in (
+                ("append", lambda units: [*units, "appended"]),
+                ("few edits", lambda units: self.edit(rand, units, 3)),
+                ("edits throughout", lambda units: self.edit(rand, units, 100, spread=True)),
+            ):
+                old = separator.join(units)
+                new = separator.join(edit(units))
+                changed_time = best_time(lambda old=old, new=new: changed_text(old, new))
+                full_time = best_time(lambda old=old, new=new: full_diff(old, new), repeat=1)
+                report(
+                    f"{'Lines' if multiline else 'Words'}, {name}",
+                    changed_text=ms(changed_time),
+                    full_diff=ms(full_time),
+                )
+                self.assertLess(changed_time, 0.05)
+
+    @staticmethod
+    def edit(rand, units, count, spread=False):
+        units = list(units)
+        if spread:
+            positions = range(0, len(units), len(units) // count)
+        else:
+            positions = rand.sample(range(len(units)), count)
+        for position in positions:
+            units[position] = "edited"
+        return units
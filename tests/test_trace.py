@@ -0,0 +1,75 @@
+# test_trace
+# recording clipboard update traces and replaying them with latency reports.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import os
+import tempfile
+import unittest
+
+from autoclip.trace import TraceRecorder, load_trace, replay_trace
+
+from . import nvda_stubs
+
+BURST = [(1 + index * 0.001, f"update {index}") for index in range(200)]
+
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.conf = nvda_stubs.reset()
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.path = os.path.join(temporary.name, "trace.tsv")
+
+    def write(self, updates, include_text=True):
+        recorder = TraceRecorder(self.path, include_text)
+        for timestamp, text in updates:
+            recorder.notified(timestamp)
+            recorder.read(text)
+        recorder.close()
+
+    def test_round_trip(self):
+        self.write([(1.0, "tab\there"), (2.5, None), (3.0, "")])
+        self.assertEqual(load_trace(self.path), [(1.0, "tab\there"), (2.5, None), (3.0, "")])
+        self.write([(1.0, "same"), (2.0, "same"), (3.0, "other")], include_text=False)
+        texts = [text for _timestamp, text in load_trace(self.path)]
+        self.assertEqual([len(text) for text in texts], [4, 4, 5])
+        self.assertEqual(texts[0], texts[1])
+        self.assertNotEqual(texts[1], texts[2])
+
+    def test_burst_overflows_the_queue(self):
+        self.write(BURST)
+        report = replay_trace(self.path, self.conf)
+        self.assertEqual(report.updates, 200)
+        self.assertEqual(report.queued, 200)
+        self.assertGreater(report.queue_dropped, 0)
+        self.assertEqual(report.stale, 0)
+        self.assertEqual(report.dropped, report.queue_dropped)
+        # text waits for the main thread, up to the 10 ms it takes to get there
+        self.assertLessEqual(max(report.latencies), 0.01 + 1e-9)
+        self.assertIn("pushed out of the queue", report.summary())
+
+    def test_latest_only_drops_stale_text(self):
+        self.write(BURST)
+        report = replay_trace(self.path, self.conf, speakLatestOnly=True)
+        self.assertGreater(report.stale, 0)
+        self.assertEqual(report.dropped, report.stale + report.queue_dropped)
+        self.assertLess(report.spoken, 50)
+
+    def test_adaptive_timing_coalesces_the_burst(self):
+        self.write(BURST)
+        report = replay_trace(self.path, self.conf, adaptiveTiming=True)
+        self.assertGreater(report.coalesced, 0)
+        self.assertEqual(report.updates, report.coalesced + report.queued)
+
+    def test_skipped_ignored_and_duplicates(self):
+        self.write([(1.0, "hello"), (1.01, "hello"), (2.0, None), (3.0, "   "), (4.0, "bye")])
+        report = replay_trace(self.path, self.conf, debounceDelay=1000)
+        self.assertEqual(
+            (report.queued, report.duplicates, report.skipped, report.ignored), (2, 1, 1, 1)
+        )
+        self.assertEqual(report.spoken, 2)
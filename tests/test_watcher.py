@@ -0,0 +1,69 @@
+# test_watcher
+# skipping clipboard reads that can't give new text.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import collections
+
+from autoclip.backends import MemoryBackend
+from autoclip.stats import stats
+from autoclip.watcher import UPDATE_DUPLICATE, UPDATE_QUEUED, UPDATE_SKIPPED
+
+from . import nvda_stubs
+from .helpers import WatcherTestCase
+
+
+class UnknownSequenceBackend(MemoryBackend):
+    # like when GetClipboardSequenceNumber fails
+    def sequence_number(self):
+        return 0
+
+
+class SkipTest(WatcherTestCase):
+    def notify_repeatedly(self, texts, notifications):
+        # every text is followed by notifications that don't change the clipboard,
+        # as some programs send several for one copy. Returns how often each outcome happened.
+        outcomes = collections.Counter()
+        for text in texts:
+            self.clock.advance(1)
+            self.backend.text = text
+            self.backend.sequence += 1
+            for _notification in range(notifications):
+                outcomes[self.watcher.read(self.backend.sequence_number())] += 1
+        return outcomes
+
+    def test_unchanged_sequence_number_is_not_read(self):
+        self.make_watcher(debounceDelay=0)
+        outcomes = self.notify_repeatedly([f"text {index}" for index in range(10)], 10)
+        self.assertEqual(outcomes, {UPDATE_QUEUED: 10, UPDATE_SKIPPED: 90})
+        self.assertEqual(self.backend.opens, 10)
+
+    def test_clipboard_without_text_is_not_opened(self):
+        self.make_watcher(debounceDelay=0)
+        outcomes = self.notify_repeatedly(["text", None, None, "other", None], 1)
+        self.assertEqual(outcomes, {UPDATE_QUEUED: 2, UPDATE_SKIPPED: 3})
+        self.assertEqual(self.backend.opens, 2)
+        nvda_stubs.pump()
+        self.assertEqual(nvda_stubs.spoken, [["text"], ["other"]])
+
+    def test_unknown_sequence_number_is_always_read(self):
+        self.make_watcher(start=False, debounceDelay=-1)
+        self.backend = self.watcher.backend = UnknownSequenceBackend()
+        self.watcher.start(threaded=False)
+        outcomes = self.notify_repeatedly(["text", "other"], 3)
+        # the repeats are still caught by the debounce filter, after reading the clipboard
+        self.assertEqual(outcomes, {UPDATE_QUEUED: 2, UPDATE_DUPLICATE: 4})
+        self.assertEqual(self.backend.opens, 6)
+
+    def test_skipped_updates_are_counted_in_stats(self):
+        self.make_watcher(debounceDelay=0, collectStatistics=True)
+        stats.reset()
+        self.addCleanup(stats.reset)
+        self.addCleanup(setattr, stats, "enabled", False)
+        self.notify_repeatedly(["a", "b"], 5)
+        self.assertEqual(stats.counters[UPDATE_SKIPPED], 8)
+        self.assertEqual(stats.counters[UPDATE_QUEUED], 2)
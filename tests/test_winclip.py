@@ -0,0 +1,200 @@
+# test_winclip
+# reading clipboard text through the Win32 bindings, on a fake user32 and kernel32.
+# A part of the Autoclip add-on for NVDA
+# Copyright (C) 2023 Mazen Alharbi
+# This file is covered by the GNU General Public License Version 2.
+# See the file LICENSE for more details.
+# If the LICENSE file is not available, you can find the  GNU General Public License Version 2 at this link:
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+
+import ctypes
+import functools
+import unittest
+from ctypes.wintypes import BOOL, DWORD, HANDLE, HGLOBAL, HWND, LPVOID, UINT
+
+from autoclip import DEFAULT_MAX_LENGTH
+from autoclip.backends import SNAPSHOT_OPEN_FAILED
+from logHandler import log
+
+from . import nvda_stubs  # noqa: F401
+from .benchmark import benchmark, best_time, kb, ms, peak_memory, report, us
+from .fake_win32 import CF_UNICODETEXT, FakeClipboard, FakeDll, load_winclip
+
+
+class WinclipTest(unittest.TestCase):
+    def setUp(self):
+        self.clipboard = FakeClipboard()
+        self.winclip = load_winclip(self.clipboard)
+
+    def read(self, max_length=None, tail=False):
+        snapshot = self.winclip.read_text_snapshot(None, max_length, tail)
+        self.assertFalse(self.clipboard.is_open)
+        self.assertEqual(self.clipboard.locks, 0)
+        return snapshot
+
+    def test_text_longer_than_max_length_is_rejected(self):
+        self.clipboard.set_text("0123456789")
+        self.assertEqual(self.read(), ("0123456789", 1, None))
+        self.assertEqual(self.read(10).text, "0123456789")
+        self.assertEqual(self.read(9).text, "")
+
+    def test_tail_of_longer_text(self):
+        self.clipboard.set_text("0123456789")
+        self.assertEqual(self.read(5, tail=True).text, "456789")
+        self.assertEqual(self.read(20, tail=True).text, "0123456789")
+
+    def test_memory_larger_than_the_text(self):
+        self.clipboard.set_text("short", size=1000)
+        self.assertEqual(self.read().text, "short")
+        self.assertEqual(self.read(10).text, "short")
+        self.assertEqual(self.read(3, tail=True).text, "hort")
+
+    def test_clipboard_held_open(self):
+        self.clipboard.set_text("text")
+        self.clipboard.is_open = True
+        self.assertEqual(self.winclip.read_text_snapshot(None).error, SNAPSHOT_OPEN_FAILED)
+
+
+@benchmark
+class BoundedCopyBenchmark(unittest.TestCase):
+    # Clipboards of 1 KB, 1 MB and 100 MB of UTF-16 text, read with the default maximum length,
+    # against copying all of the text out first as before the copy was bounded.
+    def test_clipboard_sizes(self):
+        clipboard = FakeClipboard()
+        winclip = load_winclip(clipboard)
+        for name, size in (("1 KB", 1024), ("1 MB", 1024**2), ("100 MB", 100 * 1024**2)):
+            clipboard.set_text("x" * (size // 2))
+            handle = clipboard.formats[winclip.CF_UNICODETEXT]
+
+            def bounded():
+                winclip.OpenClipboard(None)
+                try:
+                    return winclip.get_clipboard_data(max_length=DEFAULT_MAX_LENGTH)
+                finally:
+                    winclip.CloseClipboard()
+
+            def unbounded(handle=handle):
+                text = ctypes.wstring_at(winclip.GlobalLock(handle))
+                winclip.GlobalUnlock(handle)
+                return text if len(text) <= DEFAULT_MAX_LENGTH else ""
+
+            bounded_time = best_time(bounded, repeat=3)
+            unbounded_time = best_time(unbounded, repeat=3)
+            bounded_memory = peak_memory(bounded)
+            unbounded_memory = peak_memory(unbounded)
+            report(
+                f"{name} clipboard",
+                bounded=f"{ms(bounded_time)} {kb(bounded_memory)}",
+                unbounded=f"{ms(unbounded_time)} {kb(unbounded_memory)}",
+            )
+            # at most max_length + 1 characters are ever copied
+            self.assertLess(bounded_memory, 4 * DEFAULT_MAX_LENGTH * ctypes.sizeof(ctypes.c_wchar))
+            if size >= 1024**2:
+                self.assertLess(bounded_time * 10, unbounded_time)
+
+
+class error_check:
+    # the wrapper every checked binding went through before bind() and errcheck, kept as a reference
+    def __init__(self, func):
+        super().__setattr__("func", func)
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        result = self.func(*args, **kwargs)
+        if not result:
+            error_code = ctypes.GetLastError()
+            if error_code != 0:
+                error_message = f"Error in {self.func.__name__}"
+                exc = ctypes.WinError(error_code)
+                log.error(error_message, exc_info=exc)
+        return result
+
+    def __setattr__(self, name, value):
+        if name in ("argtypes", "restype"):
+            setattr(self.func, name, value)
+        else:
+            super().__setattr__(name, value)
+
+    def __getattr__(self, name):
+        if name in ("argtypes", "restype"):
+            return getattr(self.func, name)
+        raise AttributeError("name")
+
+
+def old_bindings(dll, wrap=True):
+    # bound the way winclip bound them before on the same fake dll, without any check if not wrap
+    bindings = {}
+    for name, argtypes, restype, checked in (
+        ("OpenClipboard", [HWND], BOOL, False),
+        ("CloseClipboard", [], BOOL, True),
+        ("GetClipboardData", [UINT], HANDLE, True),
+        ("GetClipboardSequenceNumber", [], DWORD, False),
+        ("GlobalLock", [HGLOBAL], LPVOID, True),
+        ("GlobalSize", [HGLOBAL], ctypes.c_size_t, True),
+        ("GlobalUnlock", [HGLOBAL], BOOL, True),
+    ):
+        func = dll[name]
+        if checked and wrap:
+            func = error_check(func)
+        func.argtypes = argtypes
+        func.restype = restype
+        bindings[name] = func
+    return bindings
+
+
+def old_read(win32, max_length):
+    # the calls of a read before read_text_snapshot: opening, the sequence number, then the text
+    if not win32["OpenClipboard"](None):
+        return None
+    try:
+        sequence = win32["GetClipboardSequenceNumber"]()
+        handle = win32["GetClipboardData"](CF_UNICODETEXT)
+        if not handle:
+            return "", sequence
+        size = win32["GlobalSize"](handle) // ctypes.sizeof(ctypes.c_wchar)
+        if not size:
+            return "", sequence
+        size = min(size, max_length + 1)
+        locked_handle = win32["GlobalLock"](handle)
+        if not locked_handle:
+            return "", sequence
+        try:
+            data = ctypes.wstring_at(locked_handle, size)
+        finally:
+            win32["GlobalUnlock"](handle)
+    finally:
+        win32["CloseClipboard"]()
+    end = data.find("\0")
+    return (data if end == -1 else data[:end]), sequence
+
+
+@benchmark
+class ReadOverheadBenchmark(unittest.TestCase):
+    # Per-read overhead of the Win32 bindings on a short text, so the time isn't spent in copying:
+    # the error_check wrapped bindings as before, against read_text_snapshot. The fake functions are
+    # Python callbacks costing far more than the real ones, so the same calls without any check are
+    # timed as well, and the overhead reported is what either read spends on top of them.
+    def test_short_text(self):
+        clipboard = FakeClipboard()
+        clipboard.set_text("short clipboard text")
+        winclip = load_winclip(clipboard)
+        wrapped = old_bindings(FakeDll(clipboard))
+        unchecked = old_bindings(FakeDll(clipboard), wrap=False)
+        self.assertEqual(
+            old_read(wrapped, DEFAULT_MAX_LENGTH),
+            tuple(winclip.read_text_snapshot(None, DEFAULT_MAX_LENGTH)[:2]),
+        )
+        number = 2000
+        baseline = best_time(
+            lambda: old_read(unchecked, DEFAULT_MAX_LENGTH), number=number, repeat=30
+        )
+        before = best_time(lambda: old_read(wrapped, DEFAULT_MAX_LENGTH), number=number, repeat=30)
+        after = best_time(
+            lambda: winclip.read_text_snapshot(None, DEFAULT_MAX_LENGTH), number=number, repeat=30
+        )
+        report(
+            "Per read overhead",
+            fake_calls=us(baseline),
+            before=f"+{us(before - baseline)}",
+            after=f"+{us(after - baseline)}",
+        )